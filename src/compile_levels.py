@@ -0,0 +1,70 @@
+import argparse
+import logging
+import os.path
+import sys
+
+from parser.compiled import write_collection
+from parser.parsers import SokParser
+from util.util import exit_with_error
+
+PARSERS = {
+    "sok": SokParser
+}
+
+arg_parser = argparse.ArgumentParser(add_help=False)
+
+required = arg_parser.add_argument_group("required")
+optional = arg_parser.add_argument_group("optional")
+
+required.add_argument("output",
+                      type=str,
+                      help="output file path")
+optional.add_argument("-i", "--input",
+                      type=str,
+                      help="input file path")
+optional.add_argument("-f", "--force",
+                      action="store_true",
+                      help="overwrite output file")
+optional.add_argument("-p", "--parser",
+                      type=str,
+                      choices=PARSERS.keys(), default="sok",
+                      help="parser type (default: %(default)s)")
+optional.add_argument("--debug",
+                      action="store_true",
+                      help="enable debug logging")
+optional.add_argument("-h", "--help",
+                      action="help",
+                      help="show this help message and exit"
+                      )
+
+args = arg_parser.parse_args()
+
+if args.debug:
+    logging.basicConfig(format="[%(asctime)s] %(levelname)s: %(message)s", level=logging.DEBUG)
+else:
+    logging.basicConfig(format="[%(asctime)s] %(levelname)s: %(message)s")
+
+if os.path.exists(args.output) and not args.force:
+    exit_with_error(f"File '{args.output}' already exists. Run with the --force flag to overwrite files.")
+
+# Open input
+if args.input is not None:
+    try:
+        in_file = open(args.input, "r")
+    except FileNotFoundError:
+        exit_with_error("File not found: " + args.input)
+else:
+    in_file = sys.stdin
+
+parser = PARSERS[args.parser]()
+logging.debug(f"Using parser: {type(parser)}")
+
+os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+with in_file, open(args.output, "wb") as out_file:
+    count = write_collection(parser.iter_levels(in_file), out_file)
+
+if count == 0:
+    os.remove(args.output)
+    exit_with_error("No parseable levels found in input")
+
+logging.debug(f"Compiled {count} levels into {args.output}")
@@ -0,0 +1,74 @@
+import bisect
+
+from explorer.mdp import ExplicitModel
+from parser.level import Level
+
+
+def _node_count(entries: list[tuple[tuple[int, ...], object]], width: int) -> int:
+    # Number of nodes, terminals included, of the reduced ordered (MT)BDD of the function that maps the given bit
+    # vectors to their value and everything else to zero. Bit vectors are in the order of the BDD variables.
+    entries = sorted(entries)
+    keys = [bits for bits, _ in entries]
+    terminals, unique = {}, {}
+
+    def build(lo: int, hi: int, depth: int) -> int:
+        if lo == hi:
+            return terminals.setdefault(("zero",), -len(terminals) - 1)
+
+        if depth == width:
+            return terminals.setdefault(("value", entries[lo][1]), -len(terminals) - 1)
+
+        # Entries in the range share the first depth bits, so the ones with bit depth set come last
+        split = bisect.bisect_left(keys, (*keys[lo][:depth], 1), lo, hi)
+        low, high = build(lo, split, depth + 1), build(split, hi, depth + 1)
+        if low == high:
+            return low
+
+        return unique.setdefault((depth, low, high), len(unique))
+
+    build(0, len(entries), 0)
+    return len(unique) + len(terminals)
+
+
+def _to_bits(value: int, width: int) -> tuple[int, ...]:
+    return tuple((value >> (width - 1 - i)) & 1 for i in range(width))
+
+
+def _state_encoder(model: ExplicitModel, level: Level, order: list[int]):
+    # Bits of a state as a symbolic engine encodes the generated model: the position relative to its lower bound,
+    # most significant bit first, followed by the box variables in declaration order
+    position_width = (level.last_pos - level.first_pos).bit_length()
+    position_mask = (1 << model.position_bits) - 1
+    shifts = [t + model.position_bits for t in order]
+
+    def encode(state: int) -> tuple[int, ...]:
+        return _to_bits((state & position_mask) - level.first_pos, position_width) + \
+            tuple((state >> shift) & 1 for shift in shifts)
+
+    return encode, position_width + len(order)
+
+
+def reachable_nodes(model: ExplicitModel, level: Level, order: list[int]) -> int:
+    # Size of the BDD of the reachable states
+    encode, width = _state_encoder(model, level, order)
+    return _node_count([(encode(s), True) for s in model.states], width)
+
+
+def transition_nodes(model: ExplicitModel, level: Level, order: list[int]) -> int:
+    # Size of the MTBDD of the transition probabilities. As in PRISM, the variables that pick the action come first,
+    # followed by the state variables with every current state bit directly before the bit of the next state.
+    encode, width = _state_encoder(model, level, order)
+    bits = [encode(s) for s in model.states]
+
+    actions = sorted({c.action for choices in model.choices for c in choices})
+    action_width = (len(actions) - 1).bit_length()
+    action_bits = {a: _to_bits(i, action_width) for i, a in enumerate(actions)}
+
+    entries = []
+    for source, choices in enumerate(model.choices):
+        for choice in choices:
+            for target, probability in choice.distribution:
+                interleaved = tuple(b for pair in zip(bits[source], bits[target]) for b in pair)
+                entries.append((action_bits[choice.action] + interleaved, probability))
+
+    return _node_count(entries, action_width + 2 * width)
@@ -0,0 +1,87 @@
+import math
+from fractions import Fraction
+
+from explorer.mdp import ExplicitModel, Choice, Probability
+
+
+def _weights(model: ExplicitModel, mu: Fraction | None) -> dict[Probability, int]:
+    # Integer weight of every probability over a common denominator, so that summing and comparing them is cheap.
+    # Without a value for mu, constant + mu * coefficient becomes constant + coefficient * (denominator + 1). The
+    # constant of a sum of transitions is between 0 and the denominator, so different sums get different weights.
+    probabilities = {p for choices in model.choices for c in choices for _, p in c.distribution}
+    values = {p: (p.constant, p.mu) if mu is None else (p.evaluate(mu),) for p in probabilities}
+
+    denominator = math.lcm(*(v.denominator for value in values.values() for v in value))
+    return {p: sum(int(v * denominator) * (denominator + 1) ** i for i, v in enumerate(value))
+            for p, value in values.items()}
+
+
+def _lift(distribution: list[tuple[int, int]], blocks: list[int]) -> frozenset:
+    # Weight of moving to every block. Transitions that get probability 0 for the chosen mu are left out.
+    lifted = {}
+    for target, weight in distribution:
+        block = blocks[target]
+        lifted[block] = lifted.get(block, 0) + weight
+
+    return frozenset((block, weight) for block, weight in lifted.items() if weight != 0)
+
+
+def bisimulation_blocks(model: ExplicitModel, mu: Fraction | None = None) -> tuple[list[int], int]:
+    # Signature-based partition refinement, starting from the labels. States stay in the same block while they have the
+    # same set of distributions over blocks. Action names do not matter for reaching the goal and are ignored.
+    # Returns the block of every state, numbered in order of their first state, and the number of blocks.
+    weights = _weights(model, mu)
+    distributions = [[[(target, weights[p]) for target, p in c.distribution] for c in choices]
+                     for choices in model.choices]
+
+    signatures = {}
+    blocks = [signatures.setdefault((s in model.goals, s in model.deadlocks), len(signatures))
+              for s in range(len(model.states))]
+
+    count = len(signatures)
+    while True:
+        # Blocks are only ever split, so the partition is stable once the number of blocks stays the same
+        signatures = {}
+        blocks = [signatures.setdefault((blocks[s], frozenset(_lift(d, blocks) for d in choices)), len(signatures))
+                  for s, choices in enumerate(distributions)]
+
+        if len(signatures) == count:
+            return blocks, count
+
+        count = len(signatures)
+
+
+def minimize(model: ExplicitModel, mu: Fraction | None = None) -> ExplicitModel:
+    # Quotient of the model under probabilistic bisimulation. Every block is represented by its first state, choices of
+    # that state with the same distribution over blocks are merged.
+    blocks, count = bisimulation_blocks(model, mu)
+    weights = _weights(model, mu)
+
+    representatives = [-1] * count
+    for s, block in enumerate(blocks):
+        if representatives[block] == -1:
+            representatives[block] = s
+
+    choices = []
+    for s in representatives:
+        merged = {}
+        for choice in model.choices[s]:
+            distribution = {}
+            for target, p in choice.distribution:
+                block = blocks[target]
+                distribution[block] = distribution[block] + p if block in distribution else p
+
+            merged.setdefault(_lift([(target, weights[p]) for target, p in choice.distribution], blocks),
+                              Choice(choice.action, sorted(distribution.items())))
+
+        choices.append(list(merged.values()))
+
+    return ExplicitModel(
+        states=[model.states[s] for s in representatives],
+        choices=choices,
+        goals={blocks[s] for s in model.goals},
+        deadlocks={blocks[s] for s in model.deadlocks},
+        position_bits=model.position_bits,
+        box_tiles=model.box_tiles,
+        initial=blocks[model.initial]
+    )
@@ -0,0 +1,186 @@
+from explorer.mdp import ExplicitModel, Choice, ONE, outcome_probability
+from generator.generator import _box_tiles
+from parser.level import Level, TileSet
+
+
+class StateLimitExceeded(Exception):
+    pass
+
+
+def _directions(level: Level) -> dict[int, list[tuple[str, int, int | None]]]:
+    # For every reachable tile, the directions the player can step in, with the tile stepped on and the tile behind it
+    # (None if a box can not be pushed there)
+    offsets = {
+        "up": -level.columns,
+        "down": level.columns,
+        "left": -1,
+        "right": 1
+    }
+
+    reachable = level.reachable_tiles
+
+    directions = {}
+    for x in reachable:
+        directions[x] = [(d, x + o, x + 2 * o if x + 2 * o in reachable else None)
+                         for d, o in offsets.items() if x + o in reachable]
+
+    return directions
+
+
+def _step(position: int, boxes: int, y: int, z: int | None, box_tiles: int) -> tuple[int, int] | None:
+    # Intended step, None if it is blocked. Only box tiles can hold a box, so other tiles are always free.
+    if not (boxes >> y) & 1:
+        return y, boxes
+
+    if z is None:
+        return None
+
+    # Pushing a box onto a dead square removes it
+    if not (box_tiles >> z) & 1:
+        return y, boxes & ~(1 << y)
+
+    if (boxes >> z) & 1:
+        return None
+
+    return y, boxes ^ (1 << y) ^ (1 << z)
+
+
+def _slip(position: int, boxes: int, y: int, z: int | None, box_tiles: int) -> tuple[int, int]:
+    # Accidental step. A slip onto a free tile only moves the player if no box could have been pushed from it.
+    if not (boxes >> y) & 1:
+        return (y, boxes) if z is None else (position, boxes)
+
+    return _step(position, boxes, y, z, box_tiles) or (position, boxes)
+
+
+def explore(level: Level, limit: int | None = None) -> ExplicitModel:
+    box_tiles = list(_box_tiles(level))
+    box_bits = sum(1 << i for i in box_tiles)
+
+    position_bits = level.size.bit_length()
+    position_mask = (1 << position_bits) - 1
+    directions = _directions(level)
+
+    initial = (level.box_bits & box_bits) << position_bits | level.player
+    index = {initial: 0}
+    model = ExplicitModel(states=[initial], choices=[], goals=set(), position_bits=position_bits, box_tiles=box_tiles)
+
+    current = 0
+    while current < len(model.states):
+        encoded = model.states[current]
+        position, boxes = encoded & position_mask, encoded >> position_bits
+
+        if boxes & level.goal_bits == level.goal_bits:
+            model.goals.add(current)
+
+        choices = []
+        steps = directions[position]
+        for d, y, z in steps:
+            target = _step(position, boxes, y, z, box_bits)
+            if target is None:
+                continue
+
+            outcomes = [target] + [_slip(position, boxes, sy, sz, box_bits) for sd, sy, sz in steps if sd != d]
+
+            # Outcomes that end up in the same state are merged, counting how often every state is reached by slipping
+            weights = {}
+            for k, (p, b) in enumerate(outcomes):
+                state = b << position_bits | p
+                if state not in index:
+                    if limit is not None and len(model.states) >= limit:
+                        raise StateLimitExceeded(f"More than {limit} reachable states")
+
+                    index[state] = len(model.states)
+                    model.states.append(state)
+
+                intended, slips = weights.get(index[state], (False, 0))
+                weights[index[state]] = (intended or k == 0, slips + (k > 0))
+
+            choices.append(Choice(d, [(t, outcome_probability(len(steps) - 1, *w)) for t, w in weights.items()]))
+
+        # Without any enabled action the player is stuck, which is modelled as a self-loop
+        if not choices:
+            model.deadlocks.add(current)
+            choices.append(Choice("", [(current, ONE)]))
+
+        model.choices.append(choices)
+        current += 1
+
+    return model
+
+
+def _region(position: int, free: int, columns: int) -> int:
+    # Tiles the player can walk to without pushing a box, flood filled on the bitset of free tiles
+    region = 1 << position
+    while True:
+        grown = (region | region << 1 | region >> 1 | region << columns | region >> columns) & free
+        if grown == region:
+            return region
+
+        region = grown
+
+
+def explore_pushes(level: Level, limit: int | None = None) -> ExplicitModel:
+    # Every action is a push, walking to the box is free. The player position is normalized to the first tile of the
+    # region it can walk to, so states that only differ in where the player stands inside that region are merged.
+    box_tiles = list(_box_tiles(level))
+    box_bits = sum(1 << i for i in box_tiles)
+
+    position_bits = level.size.bit_length()
+    position_mask = (1 << position_bits) - 1
+    directions = _directions(level)
+    reachable, columns = level.reachable_bits, level.columns
+
+    def normalize(position: int, boxes: int) -> int:
+        region = _region(position, reachable & ~boxes, columns)
+        return boxes << position_bits | (region & -region).bit_length() - 1
+
+    initial = normalize(level.player, level.box_bits & box_bits)
+    index = {initial: 0}
+    model = ExplicitModel(states=[initial], choices=[], goals=set(), position_bits=position_bits, box_tiles=box_tiles)
+
+    current = 0
+    while current < len(model.states):
+        encoded = model.states[current]
+        position, boxes = encoded & position_mask, encoded >> position_bits
+
+        if boxes & level.goal_bits == level.goal_bits:
+            model.goals.add(current)
+
+        choices = []
+        for x in TileSet(_region(position, reachable & ~boxes, columns)):
+            steps = directions[x]
+            for d, y, z in steps:
+                if not (boxes >> y) & 1:
+                    continue
+
+                target = _step(x, boxes, y, z, box_bits)
+                if target is None:
+                    continue
+
+                outcomes = [target] + [_slip(x, boxes, sy, sz, box_bits) for sd, sy, sz in steps if sd != d]
+
+                weights = {}
+                for k, (p, b) in enumerate(outcomes):
+                    # Without a push the player stays in the same region
+                    state = encoded if b == boxes else normalize(p, b)
+                    if state not in index:
+                        if limit is not None and len(model.states) >= limit:
+                            raise StateLimitExceeded(f"More than {limit} reachable states")
+
+                        index[state] = len(model.states)
+                        model.states.append(state)
+
+                    intended, slips = weights.get(index[state], (False, 0))
+                    weights[index[state]] = (intended or k == 0, slips + (k > 0))
+
+                choices.append(Choice(d, [(t, outcome_probability(len(steps) - 1, *w)) for t, w in weights.items()]))
+
+        if not choices:
+            model.deadlocks.add(current)
+            choices.append(Choice("", [(current, ONE)]))
+
+        model.choices.append(choices)
+        current += 1
+
+    return model
@@ -0,0 +1,69 @@
+import functools
+from dataclasses import dataclass, field
+from fractions import Fraction
+from typing import NamedTuple
+
+
+@dataclass(frozen=True)
+class Probability(object):
+    # Probabilities are linear in mu: constant + mu * coefficient
+    constant: Fraction
+    mu: Fraction = Fraction(0)
+
+    def __add__(self, other: "Probability") -> "Probability":
+        return Probability(self.constant + other.constant, self.mu + other.mu)
+
+    def __str__(self) -> str:
+        if self.mu == 0:
+            return str(self.constant)
+
+        term = "mu" if self.mu == 1 else "-mu" if self.mu == -1 else f"{self.mu}*mu"
+        if self.constant == 0:
+            return term
+
+        return f"{self.constant}{term}" if term.startswith("-") else f"{self.constant}+{term}"
+
+    def evaluate(self, mu: Fraction) -> Fraction:
+        return self.constant + self.mu * mu
+
+
+ONE = Probability(Fraction(1))
+
+
+@functools.cache
+def outcome_probability(alternatives: int, intended: bool, slips: int) -> Probability:
+    # Probability of reaching a state by the intended step (mu) and/or by slipping in some of the alternative directions
+    # ((1-mu)/alternatives each). Without alternatives the intended step always happens.
+    if alternatives == 0:
+        return ONE
+
+    slip = Fraction(slips, alternatives)
+    return Probability(slip, (1 if intended else 0) - slip)
+
+
+class Choice(NamedTuple):
+    action: str
+    distribution: list[tuple[int, Probability]]
+
+
+@dataclass
+class ExplicitModel(object):
+    # Encoded states (player position in the lower bits, box bitset above), the index of a state is its id
+    states: list[int]
+    choices: list[list[Choice]]
+    goals: set[int]
+    deadlocks: set[int] = field(default_factory=set)
+
+    # Layout of the encoded states
+    position_bits: int = 0
+    box_tiles: list[int] = field(default_factory=list)
+
+    initial: int = 0
+
+    @property
+    def transitions(self) -> int:
+        return sum(len(c.distribution) for choices in self.choices for c in choices)
+
+    def decode(self, state: int) -> tuple[int, int]:
+        encoded = self.states[state]
+        return encoded & ((1 << self.position_bits) - 1), encoded >> self.position_bits
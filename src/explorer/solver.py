@@ -0,0 +1,169 @@
+from fractions import Fraction
+
+import numpy as np
+
+from explorer.mdp import ExplicitModel
+
+# Quotient indices of the states whose value is known in advance
+ZERO, ONE = 0, 1
+
+
+def _sccs(nodes: list[int], successors: dict[int, list[int]]) -> dict[int, int]:
+    # Iterative Tarjan, maps every node to the id of its strongly connected component
+    index, low, component = {}, {}, {}
+    stack, on_stack = [], set()
+    count = 0
+
+    for root in nodes:
+        if root in index:
+            continue
+
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(successors[root]))]
+
+        while work:
+            node, it = work[-1]
+            for successor in it:
+                if successor not in index:
+                    index[successor] = low[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(successors[successor])))
+                    break
+
+                if successor in on_stack:
+                    low[node] = min(low[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+
+                if low[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component[member] = count
+                        if member == node:
+                            break
+
+                    count += 1
+
+    return component
+
+
+def _end_components(candidates: set[int], choices: dict[int, list[list[int]]]) -> dict[int, int]:
+    # Maximal end components among the candidate states, using only the given choices (lists of successors).
+    # Repeatedly drops choices that leave their strongly connected component until nothing changes.
+    active = {s: [c for c in choices[s] if all(t in candidates for t in c)] for s in candidates}
+    active = {s: c for s, c in active.items() if c}
+
+    while True:
+        successors = {s: list({t for c in cs for t in c if t in active}) for s, cs in active.items()}
+        component = _sccs(list(active), successors)
+
+        changed = False
+        remaining = {}
+        for s, cs in active.items():
+            kept = [c for c in cs if all(component.get(t) == component[s] for t in c)]
+            changed |= len(kept) != len(cs)
+            if kept:
+                remaining[s] = kept
+
+        active = remaining
+        if not changed:
+            return {s: component[s] for s in active}
+
+
+def _support_class(mu: Fraction) -> Fraction:
+    # Transitions with probability 0 only exist for mu = 0 and mu = 1, any other value has the same graph
+    return mu if mu in (0, 1) else Fraction(1, 2)
+
+
+def _solve_class(model: ExplicitModel, mus: list[Fraction], epsilon: float) -> list[float]:
+    representative = _support_class(mus[0])
+    n = len(model.states)
+
+    # Successors of every choice with a positive probability
+    graph = [[[t for t, p in c.distribution if p.evaluate(representative) > 0] for c in choices]
+             for choices in model.choices]
+
+    # States that can reach a goal state, the others have probability 0
+    predecessors = [[] for _ in range(n)]
+    for s, choices in enumerate(graph):
+        for c in choices:
+            for t in c:
+                predecessors[t].append(s)
+
+    can_reach, stack = set(model.goals), list(model.goals)
+    while stack:
+        for s in predecessors[stack.pop()]:
+            if s not in can_reach:
+                can_reach.add(s)
+                stack.append(s)
+
+    # End components would give the upper bound a fixpoint above the real probability, so they are collapsed into a
+    # single state without the choices that stay inside them
+    unknown = can_reach - model.goals
+    components = _end_components(unknown, {s: graph[s] for s in unknown})
+
+    quotient = np.full(n, ZERO, dtype=np.int64)
+    quotient[list(model.goals)] = ONE
+    representatives = {}
+    for s in sorted(unknown):
+        key = ("c", components[s]) if s in components else s
+        quotient[s] = representatives.setdefault(key, len(representatives) + 2)
+
+    rows, row_state, entry_target, entry_constant, entry_mu = [], [], [], [], []
+    for s in sorted(unknown, key=lambda s: quotient[s]):
+        for choice, successors in zip(model.choices[s], graph[s]):
+            if s in components and all(components.get(t) == components[s] for t in successors):
+                continue
+
+            rows.append(len(entry_target))
+            row_state.append(quotient[s])
+            for t, p in choice.distribution:
+                entry_target.append(quotient[t])
+                entry_constant.append(float(p.constant))
+                entry_mu.append(float(p.mu))
+
+    size = len(representatives) + 2
+    values = np.zeros((size, 2 * len(mus)))
+    values[ONE] = 1
+    if not rows:
+        return [float(values[quotient[model.initial], 0])] * len(mus)
+
+    # States without any choice leaving their end component can not reach the goal
+    row_state = np.array(row_state)
+    solved = np.unique(row_state)
+    state_start = np.searchsorted(row_state, solved)
+
+    # Lower bounds start at 0, upper bounds at 1, both are iterated at once for all values of mu
+    values[solved, len(mus):] = 1
+    mu = np.array([float(m) for m in mus] * 2)
+    probabilities = np.array(entry_constant)[:, None] + np.array(entry_mu)[:, None] * mu[None, :]
+    targets = np.array(entry_target)
+    rows = np.array(rows)
+
+    while np.max(values[solved, len(mus):] - values[solved, :len(mus)]) >= 2 * epsilon:
+        choice_values = np.add.reduceat(probabilities * values[targets], rows, axis=0)
+        values[solved] = np.maximum.reduceat(choice_values, state_start, axis=0)
+
+    lower, upper = values[quotient[model.initial], :len(mus)], values[quotient[model.initial], len(mus):]
+    return [float(v) for v in (lower + upper) / 2]
+
+
+def solve(model: ExplicitModel, mus: list[Fraction], epsilon: float = 1e-6) -> list[float]:
+    # Pmax[F goal_reached] in the initial state for every value of mu, within epsilon of the exact probability
+    classes = {}
+    for i, mu in enumerate(mus):
+        classes.setdefault(_support_class(mu), []).append(i)
+
+    results = [0.0] * len(mus)
+    for indices in classes.values():
+        for i, result in zip(indices, _solve_class(model, [mus[i] for i in indices], epsilon)):
+            results[i] = result
+
+    return results
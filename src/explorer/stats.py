@@ -0,0 +1,82 @@
+import collections
+import functools
+import json
+import math
+
+from explorer.explorer import explore, StateLimitExceeded
+from explorer.mdp import ExplicitModel
+from generator.generator import Generator, _box_tiles, _statistics
+from parser.level import Level
+
+# Number of states explored before falling back to the upper bound
+DEFAULT_LIMIT = 100_000
+
+
+def stats_path(model_path: str) -> str:
+    return f"{model_path}.stats.json"
+
+
+def read_stats(model_path: str) -> dict | None:
+    try:
+        with open(stats_path(model_path), "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def estimated_states(stats: dict) -> int:
+    # Exact if the state space was explored completely, an upper bound otherwise
+    states = stats["states"]
+    return states["explored"] if states["complete"] else states["upper_bound"]
+
+
+def minimum_states(stats: dict) -> int:
+    # Incomplete explorations stopped because there are more states than the limit
+    states = stats["states"]
+    return states["explored"] if states["complete"] else states["explored"] + 1
+
+
+@functools.lru_cache(maxsize=1)
+def _explore(level: Level, limit: int | None) -> ExplicitModel | None:
+    # The statistics of every model of a level share one exploration, None if there are more states than the limit
+    try:
+        return explore(level, limit)
+    except StateLimitExceeded:
+        return None
+
+
+def model_stats(level: Level, limit: int | None = DEFAULT_LIMIT, generator: Generator | None = None) -> dict:
+    # Statistics of the model a generator writes for a level, of a model with a boolean per box tile without one
+    box_tiles = _box_tiles(level)
+    reachable = level.reachable_tiles
+    boxes = len(level.boxes & box_tiles)
+    merged = generator.merged_tiles(level) if generator else {}
+
+    # Every box variable can be true for at most the number of boxes, fewer if boxes can be pushed off the board
+    if reachable - box_tiles:
+        configurations = sum(math.comb(len(box_tiles), k) for k in range(boxes + 1))
+    else:
+        configurations = math.comb(len(box_tiles), boxes)
+
+    model = _explore(level, limit)
+    if model is not None:
+        # States that only differ in merged positions are one state of the model
+        mask = (1 << model.position_bits) - 1
+        explored, complete = len({s & ~mask | merged.get(s & mask, s & mask) for s in model.states}), True
+    else:
+        # At most a group of merged positions becomes one state, so the model has at least (limit + 1) / group states
+        group = max(collections.Counter(merged.values()).values(), default=1)
+        explored, complete = -(-(limit + 1) // group) - 1, False
+
+    return {
+        **(generator.statistics(level) if generator else _statistics(level)),
+        "reachable_tiles": len(reachable),
+        "box_tiles": len(box_tiles),
+        "boxes": boxes,
+        "goals": len(level.goals),
+        "states": {
+            "explored": explored,
+            "complete": complete,
+            "upper_bound": (len(reachable) - len(merged) + len(set(merged.values()))) * configurations
+        }
+    }
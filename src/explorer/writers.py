@@ -0,0 +1,75 @@
+from fractions import Fraction
+from typing import TextIO
+
+from explorer.mdp import ExplicitModel, Probability
+
+
+def _format(probability: Probability, mu: Fraction | None) -> str:
+    # Without a value for mu the probability is written as a polynomial in mu
+    return str(probability) if mu is None else repr(float(probability.evaluate(mu)))
+
+
+def _distribution(distribution: list[tuple[int, Probability]], mu: Fraction | None) -> list[tuple[int, str]]:
+    # Transitions that get probability 0 for the chosen mu are left out
+    return [(target, _format(p, mu)) for target, p in distribution if mu is None or p.evaluate(mu) != 0]
+
+
+def _labels(model: ExplicitModel, state: int) -> list[str]:
+    labels = []
+    if state == model.initial:
+        labels.append("init")
+
+    if state in model.deadlocks:
+        labels.append("deadlock")
+
+    if state in model.goals:
+        labels.append("goal_reached")
+
+    return labels
+
+
+def write_drn(model: ExplicitModel, file: TextIO, mu: Fraction | None = None):
+    file.write("// Exported by stochastic-sokoban\n")
+    file.write("@type: MDP\n")
+    file.write("@parameters\n")
+    file.write("mu\n" if mu is None else "\n")
+    file.write("@reward_models\n\n")
+    file.write(f"@nr_states\n{len(model.states)}\n")
+    file.write(f"@nr_choices\n{sum(len(c) for c in model.choices)}\n")
+    file.write("@model\n")
+
+    for state, choices in enumerate(model.choices):
+        file.write(" ".join(["state", str(state), *_labels(model, state)]) + "\n")
+        for choice in choices:
+            file.write(f"\taction {choice.action or '__NOLABEL__'}\n")
+            file.writelines(f"\t\t{target} : {p}\n" for target, p in _distribution(choice.distribution, mu))
+
+
+def write_tra(model: ExplicitModel, file: TextIO, mu: Fraction):
+    transitions = [[_distribution(c.distribution, mu) for c in choices] for choices in model.choices]
+    choice_count = sum(len(c) for c in transitions)
+    transition_count = sum(len(d) for c in transitions for d in c)
+    file.write(f"{len(model.states)} {choice_count} {transition_count}\n")
+
+    for state, choices in enumerate(model.choices):
+        for i, choice in enumerate(choices):
+            action = f" {choice.action}" if choice.action else ""
+            file.writelines(f"{state} {i} {target} {p}{action}\n" for target, p in transitions[state][i])
+
+
+def write_sta(model: ExplicitModel, file: TextIO):
+    file.write("(" + ",".join(["position", *(f"box_{i}" for i in model.box_tiles)]) + ")\n")
+    for state in range(len(model.states)):
+        position, boxes = model.decode(state)
+        values = [str(position), *("true" if (boxes >> i) & 1 else "false" for i in model.box_tiles)]
+        file.write(f"{state}:(" + ",".join(values) + ")\n")
+
+
+def write_lab(model: ExplicitModel, file: TextIO):
+    names = ["init", "deadlock", "goal_reached"]
+    file.write(" ".join(f'{i}="{name}"' for i, name in enumerate(names)) + "\n")
+
+    for state in range(len(model.states)):
+        labels = _labels(model, state)
+        if labels:
+            file.write(f"{state}: " + " ".join(str(names.index(label)) for label in labels) + "\n")
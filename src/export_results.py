@@ -0,0 +1,47 @@
+import argparse
+import json
+import logging
+import os
+
+from util.results import open_store, write_json
+from util.util import exit_with_error
+
+arg_parser = argparse.ArgumentParser(add_help=False)
+
+required = arg_parser.add_argument_group("required")
+optional = arg_parser.add_argument_group("optional")
+
+required.add_argument("input",
+                      type=str,
+                      help="result file path of run_benchmark.py, run_experiment.py or run_solver.py")
+optional.add_argument("-o", "--output",
+                      type=str,
+                      help="output file path. Omit to write to stdout")
+optional.add_argument("--debug",
+                      action="store_true",
+                      help="enable debug logging")
+optional.add_argument("-h", "--help",
+                      action="help",
+                      help="show this help message and exit")
+
+args = arg_parser.parse_args()
+
+if args.debug:
+    logging.basicConfig(format="[%(asctime)s] %(levelname)s: %(message)s", level=logging.DEBUG)
+else:
+    logging.basicConfig(format="[%(asctime)s] %(levelname)s: %(message)s")
+
+if not os.path.isfile(args.input):
+    exit_with_error("File not found: " + args.input)
+
+with open_store(args.input) as store:
+    results = list(store)
+
+logging.debug(f"Exporting {len(results)} results")
+
+# The results are written as a single JSON array, as the scripts used to write them
+if args.output:
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    write_json(results, args.output)
+else:
+    print(json.dumps(results, indent=4))
@@ -0,0 +1,156 @@
+import argparse
+import logging
+import os.path
+import sys
+import time
+from fractions import Fraction
+
+from explorer.bisimulation import minimize
+from explorer.explorer import explore, explore_pushes, StateLimitExceeded
+from explorer.writers import write_drn, write_tra, write_sta, write_lab
+from parser.compiled import CompiledCollection, is_compiled
+from parser.parsers import SokParser, select_levels
+from util.util import exit_with_error
+
+PARSERS = {
+    "sok": SokParser
+}
+
+FORMATS = ["drn", "prism"]
+
+arg_parser = argparse.ArgumentParser(add_help=False)
+
+required = arg_parser.add_argument_group("required")
+optional = arg_parser.add_argument_group("optional")
+
+required.add_argument("-o", "--output",
+                      type=str,
+                      required=True,
+                      help="output file path. The prism format writes a .tra, .sta and .lab file next to it")
+optional.add_argument("-i", "--input",
+                      type=str,
+                      help="input file path")
+optional.add_argument("-ix", "--indices",
+                      nargs="+",
+                      type=int,
+                      help="space seperated list of level indices. Omit to use all levels")
+optional.add_argument("-f", "--force",
+                      action="store_true",
+                      help="overwrite output file")
+optional.add_argument("-p", "--parser",
+                      type=str,
+                      choices=PARSERS.keys(), default="sok",
+                      help="parser type (default: %(default)s)")
+optional.add_argument("-t", "--format",
+                      type=str,
+                      choices=FORMATS, default="drn",
+                      help="output format (default: %(default)s)")
+optional.add_argument("-mu",
+                      type=Fraction,
+                      help="value for mu. Omit to keep mu as a parameter (drn only)")
+optional.add_argument("-s", "--max-states",
+                      type=int,
+                      help="skip levels with more reachable states")
+optional.add_argument("--pushes",
+                      action="store_true",
+                      help="export the push-level model: walking to a box is free and every action is a push, which "
+                           "slips like a step. States only differ in the boxes and the region the player can walk to")
+optional.add_argument("--minimize",
+                      action="store_true",
+                      help="write the quotient under probabilistic bisimulation and report the number of states before "
+                           "and after. With -mu, probabilities are compared for that value only")
+optional.add_argument("--debug",
+                      action="store_true",
+                      help="enable debug logging")
+optional.add_argument("-h", "--help",
+                      action="help",
+                      help="show this help message and exit"
+                      )
+
+args = arg_parser.parse_args()
+
+if args.debug:
+    logging.basicConfig(format="[%(asctime)s] %(levelname)s: %(message)s", level=logging.DEBUG)
+else:
+    logging.basicConfig(format="[%(asctime)s] %(levelname)s: %(message)s", level=logging.INFO)
+
+if args.format == "prism" and args.mu is None:
+    exit_with_error("The prism format does not support parameters, specify a value for mu with -mu")
+
+if args.mu is not None and not 0 <= args.mu <= 1:
+    exit_with_error("The value of mu must be between 0 and 1")
+
+# Open input
+if args.input is not None:
+    try:
+        in_file = CompiledCollection(args.input) if is_compiled(args.input) else open(args.input, "r")
+    except FileNotFoundError:
+        exit_with_error("File not found: " + args.input)
+else:
+    in_file = sys.stdin
+
+parser = PARSERS[args.parser]()
+logging.debug(f"Using parser: {type(parser)}")
+
+file_name, extension = os.path.splitext(args.output)
+
+with in_file:
+    try:
+        levels = in_file if isinstance(in_file, CompiledCollection) else parser.iter_levels(in_file)
+        levels = select_levels(levels, args.indices)
+    except IndexError:
+        exit_with_error("Level index out of range")
+
+    # Total number of states before and after minimization
+    count, original_states, minimized_states = 0, 0, 0
+    for i, level in levels:
+        count += 1
+
+        start = time.perf_counter()
+        try:
+            model = (explore_pushes if args.pushes else explore)(level, args.max_states)
+        except StateLimitExceeded as e:
+            logging.warning(f"Skipped level {i}: {e}")
+            continue
+
+        logging.debug(f"Explored level {i} in {time.perf_counter() - start:.3f}s: {len(model.states)} states, "
+                      f"{model.transitions} transitions")
+
+        if args.minimize:
+            start = time.perf_counter()
+            states = len(model.states)
+            model = minimize(model, args.mu)
+
+            original_states += states
+            minimized_states += len(model.states)
+            logging.info(f"Minimized level {i} in {time.perf_counter() - start:.3f}s: {states} -> "
+                         f"{len(model.states)} states")
+
+        if args.format == "drn":
+            writers = {f"{file_name}_{i}{extension}": lambda f: write_drn(model, f, args.mu)}
+        else:
+            writers = {
+                f"{file_name}_{i}.tra": lambda f: write_tra(model, f, args.mu),
+                f"{file_name}_{i}.sta": lambda f: write_sta(model, f),
+                f"{file_name}_{i}.lab": lambda f: write_lab(model, f)
+            }
+
+        for path, write in writers.items():
+            if os.path.exists(path) and not args.force:
+                logging.warning(f"File '{path}' already exists. Run with the --force flag to overwrite files.")
+                continue
+
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w") as file:
+                write(file)
+
+            logging.debug("Wrote " + path)
+
+    if count == 0:
+        exit_with_error("No parseable levels found in input")
+
+    logging.debug(f"Found {count} levels")
+
+    if args.minimize and original_states > 0:
+        logging.info(f"Minimized {original_states} -> {minimized_states} states "
+                     f"({100 * (1 - minimized_states / original_states):.1f}% reduction)")
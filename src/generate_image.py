@@ -1,4 +1,5 @@
 import argparse
+import itertools
 import logging
 import os.path
 import sys
@@ -6,7 +7,8 @@ import sys
 from PIL import Image, ImageFont, ImageDraw
 
 from parser.level import TileType, Level
-from parser.parsers import SokParser
+from parser.compiled import CompiledCollection, is_compiled
+from parser.parsers import SokParser, select_levels
 from util.util import exit_with_error
 
 DIR = os.path.dirname(sys.argv[0])
@@ -60,7 +62,7 @@ def level_to_image(level: Level, draw_indices: bool) -> Image:
             c = (x * TILE_SIZE, y * TILE_SIZE)
             match level.board[i]:
                 case TileType.FLOOR:
-                    if i not in level.reachable_tiles:
+                    if not level.is_reachable(i):
                         continue
                     image.paste(IMG_FLOOR, c)
                 case TileType.BOX:
@@ -68,13 +70,13 @@ def level_to_image(level: Level, draw_indices: bool) -> Image:
                 case TileType.WALL:
                     image.paste(IMG_WALL, c)
 
-            if i in level.goals:
+            if level.is_goal(i):
                 image.paste(IMG_GOAL, c, IMG_GOAL)
 
             if level.player == i:
                 image.paste(IMG_PLAYER, c, IMG_PLAYER)
 
-            if level.board[i] == TileType.BOX:
+            if level.is_box(i):
                 image.paste(IMG_BOX, c, IMG_BOX)
 
     if draw_indices:
@@ -94,42 +96,45 @@ def draw_tile_indices(image: Image, level: Level) -> Image:
     return Image.alpha_composite(image, text)
 
 
-# Read levels from input
+# Open input
 if args.input is not None:
     try:
-        with open(args.input, 'r') as in_file:
-            text = in_file.read()
+        in_file = CompiledCollection(args.input) if is_compiled(args.input) else open(args.input, 'r')
     except FileNotFoundError:
         exit_with_error("File not found: " + args.input)
 else:
-    text = sys.stdin.read().rstrip()
+    in_file = sys.stdin
 
-# Parse and filter levels
-levels = PARSER.parse_levels(text)
-levels = list(map(levels.__getitem__, args.indices or range(len(levels))))
-
-if len(levels) == 0:
-    exit_with_error("No parseable levels found in input")
-
-# Generate images
-images = [level_to_image(level, args.text) for level in levels]
-
-if not args.output:
-    if len(images) > 1:
-        exit_with_error("Can only write one model to stdout. Specify an output file with --output instead.")
-
-    if args.force:
-        logging.warning("Argument --force ignored as no output file is specified")
-
-    images[0].save(sys.stdout, "png")
-else:
-    for i, img in enumerate(images):
-        file_name, extension = os.path.splitext(args.output)
-        path = f"{file_name}_{i}{extension}"
-
-        if os.path.exists(path) and not args.force:
-            logging.warning(f"File '{path}' already exists. Run with the --force flag to overwrite files.")
-
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "wb+") as file:
-            img.save(file, "png")
+with in_file:
+    # Parse and filter levels, compiled collections only decode the requested levels
+    try:
+        levels = in_file if isinstance(in_file, CompiledCollection) else PARSER.iter_levels(in_file)
+        levels = iter(select_levels(levels, args.indices))
+    except IndexError:
+        exit_with_error("Level index out of range")
+
+    first = next(levels, None)
+    if first is None:
+        exit_with_error("No parseable levels found in input")
+
+    if not args.output:
+        if next(levels, None) is not None:
+            exit_with_error("Can only write one model to stdout. Specify an output file with --output instead.")
+
+        if args.force:
+            logging.warning("Argument --force ignored as no output file is specified")
+
+        level_to_image(first[1], args.text).save(sys.stdout, "png")
+    else:
+        # Generate images
+        for i, level in itertools.chain([first], levels):
+            img = level_to_image(level, args.text)
+            file_name, extension = os.path.splitext(args.output)
+            path = f"{file_name}_{i}{extension}"
+
+            if os.path.exists(path) and not args.force:
+                logging.warning(f"File '{path}' already exists. Run with the --force flag to overwrite files.")
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb+") as file:
+                img.save(file, "png")
@@ -1,11 +1,21 @@
 import argparse
+import collections
+import itertools
+import json
 import logging
-import os.path
 import sys
 
-from generator.jani_generators import JaniNonStochasticGenerator, JaniGenerator
-from generator.prism_generators import PrismGenerator, PrismNonStochasticGenerator, PrismBGenerator
-from parser.parsers import SokParser
+from explorer.stats import stats_path
+from generator.batch import write_models
+from generator.cache import model_entry, stats_entry, manifest_path, read_manifest, write_manifest, is_cached
+from generator.generator import ORDERINGS
+from generator.jani_generators import JaniNonStochasticGenerator, JaniGenerator, JaniPosGenerator, JaniArrayGenerator
+from generator.prism_generators import PrismGenerator, PrismNonStochasticGenerator, PrismBGenerator, \
+    PrismPosGenerator
+from parser.compiled import CompiledCollection, is_compiled
+from parser.parsers import SokParser, select_levels
+from util.compression import split_extension
+from util.pool import ordered_map
 from util.util import exit_with_error
 
 PARSERS = {
@@ -15,9 +25,12 @@ PARSERS = {
 GENERATORS = {
     "jani": JaniGenerator,
     "jani-ns": JaniNonStochasticGenerator,
+    "jani-pos": JaniPosGenerator,
+    "jani-array": JaniArrayGenerator,
     "prism": PrismGenerator,
     "prism-b": PrismBGenerator,
-    "prism-ns": PrismNonStochasticGenerator
+    "prism-ns": PrismNonStochasticGenerator,
+    "prism-pos": PrismPosGenerator
 }
 
 arg_parser = argparse.ArgumentParser(add_help=False)
@@ -30,23 +43,55 @@ optional.add_argument("-i", "--input",
                       help="input file path")
 optional.add_argument("-o", "--output",
                       type=str,
-                      help="output file path")
+                      help="output file path. Models are compressed if it ends with .gz or .xz")
+optional.add_argument("-ix", "--indices",
+                      nargs="+",
+                      type=int,
+                      help="space seperated list of level indices. Omit to use all levels")
 optional.add_argument("-f", "--force",
                       action="store_true",
-                      help="overwrite output file")
+                      help="overwrite output files, also if they are up to date")
 optional.add_argument("-p", "--parser",
                       type=str,
                       choices=PARSERS.keys(), default="sok",
                       help="parser type (default: %(default)s)")
 required.add_argument("-m", "--model",
                       type=str,
-                      choices=GENERATORS.keys(),
                       required=True,
-                      help="model type")
+                      help=f"model type, or a comma separated list of model types to generate from a single "
+                           f"analysis of every level. The output path then needs a {{model}} placeholder "
+                           f"({', '.join(GENERATORS)})")
 optional.add_argument("-e", "--precision",
                       type=int,
                       default=28,
                       help="precision of floating point numbers (default: %(default)s)")
+optional.add_argument("--dedupe",
+                      action="store_true",
+                      help="only generate one model per distinct level (up to symmetry and unreachable tiles) "
+                           "and write a mapping file")
+optional.add_argument("--tunnels",
+                      action="store_true",
+                      help="collapse tunnels the player walks through into a single position. The models are only "
+                           "exact for mu > 0 (jani and prism only)")
+optional.add_argument("--compact",
+                      action="store_true",
+                      help="write jani models without whitespace, and prism models with formulas and merged commands "
+                           "(jani and prism only)")
+optional.add_argument("--functions",
+                      action="store_true",
+                      help="declare a function for expressions that occur many times (jani-pos only)")
+optional.add_argument("--ordering",
+                      type=str,
+                      choices=ORDERINGS, default="index",
+                      help="order in which box variables are declared, which symbolic engines use as BDD variable "
+                           "order (jani, jani-ns, prism, prism-b and prism-ns only) (default: %(default)s)")
+optional.add_argument("--stats",
+                      action="store_true",
+                      help="write model statistics and a state space estimate next to every model")
+optional.add_argument("-j", "--jobs",
+                      type=int,
+                      default=1,
+                      help="number of processes that generate models in parallel (default: %(default)s)")
 optional.add_argument("--debug",
                       action="store_true",
                       help="enable debug logging")
@@ -62,48 +107,167 @@ if args.debug:
 else:
     logging.basicConfig(format="[%(asctime)s] %(levelname)s: %(message)s")
 
-# Read input
+# Open input
 if args.input is not None:
     try:
-        with open(args.input, "r") as file:
-            text = file.read()
+        in_file = CompiledCollection(args.input) if is_compiled(args.input) else open(args.input, "r")
     except FileNotFoundError:
         exit_with_error("File not found: " + args.input)
 else:
-    text = sys.stdin.read().rstrip()
+    in_file = sys.stdin
 
 # Set parser and generator
 parser = PARSERS[args.parser]()
 logging.debug(f"Using parser: {type(parser)}")
 
-generator = GENERATORS[args.model]()
-logging.debug(f"Using generator: {type(generator)}")
+models = list(dict.fromkeys(args.model.split(",")))
+for model in models:
+    if model not in GENERATORS:
+        exit_with_error(f"Unknown model type '{model}', choose from {', '.join(GENERATORS)}")
 
-levels = parser.parse_levels(text)
-if len(levels) == 0:
-    exit_with_error("No parseable levels found in input")
+options = {}
+if args.tunnels:
+    if any(model not in ("jani", "prism") for model in models):
+        exit_with_error("Tunnels can only be collapsed for jani and prism models")
 
-logging.debug(f"Found {len(levels)} levels")
+    options["collapse_tunnels"] = True
 
-if not args.output:
-    if len(levels) > 1:
-        exit_with_error("Can only write one model to stdout. Specify an output file with --output instead.")
+if args.compact:
+    if any(not model.startswith("jani") and model != "prism" for model in models):
+        exit_with_error("Compact output is only supported for jani and prism models")
 
-    if args.force:
-        logging.warning("Argument --force ignored as no output file is specified")
+    options["compact"] = True
 
-    print(generator.generate_model(levels[0]))
-else:
-    for i, level in enumerate(levels):
-        model = generator.generate_model(level)
-        file_name, extension = os.path.splitext(args.output)
+if args.functions:
+    if any(model != "jani-pos" for model in models):
+        exit_with_error("Functions are only supported for jani-pos models")
+
+    options["functions"] = True
+
+if args.jobs < 1:
+    exit_with_error("The number of jobs must be at least 1")
+
+if args.ordering != "index":
+    if any(model not in ("jani", "jani-ns", "prism", "prism-b", "prism-ns") for model in models):
+        exit_with_error("The variable ordering can only be changed for jani, jani-ns, prism, prism-b and prism-ns "
+                        "models")
+
+    options["ordering"] = args.ordering
+
+# All generators of a level share its transitions, so rendering several models only analyses the level once
+generators = {model: GENERATORS[model](**options) for model in models}
+logging.debug(f"Using generators: {[type(generator) for generator in generators.values()]}")
+
+if len(models) > 1 and (not args.output or "{model}" not in args.output):
+    exit_with_error("Generating several models requires an output path with a {model} placeholder")
+
+with in_file:
+    # Levels are parsed lazily, so each model is written as soon as its level has been read.
+    # Compiled collections only decode the requested levels.
+    try:
+        levels = in_file if isinstance(in_file, CompiledCollection) else parser.iter_levels(in_file)
+        levels = iter(select_levels(levels, args.indices))
+    except IndexError:
+        exit_with_error("Level index out of range")
+
+    first = next(levels, None)
+    if first is None:
+        exit_with_error("No parseable levels found in input")
+
+    if not args.output:
+        if args.dedupe:
+            logging.warning("Argument --dedupe ignored as no output file is specified")
+
+        if args.stats:
+            logging.warning("Argument --stats ignored as no output file is specified")
+
+        if next(levels, None) is not None:
+            exit_with_error("Can only write one model to stdout. Specify an output file with --output instead.")
+
+        if args.force:
+            logging.warning("Argument --force ignored as no output file is specified")
+
+        generators[models[0]].write_model(first[1], sys.stdout)
+        print()
+    else:
+        # Output files are compressed if the output path ends with a compression, e.g. ".jani.gz"
+        outputs = {model: split_extension(args.output.replace("{model}", model)) for model in models}
+
+        # Canonical level hash -> paths of the models generated for it, and the mapping of every level per model
+        generated, mappings = {}, {model: [] for model in models}
+
+        # Output file -> key of the model or statistics it holds, files with the same key are not generated again
+        manifests = {model: read_manifest(manifest_path(file_name)) for model, (file_name, _) in outputs.items()}
+
+        # Manifest entries of the tasks in flight, in order
+        entries = collections.deque()
+
+        count = 0
+
+        def tasks():
+            global count
+            for i, level in itertools.chain([first], levels):
+                count += 1
+                paths = {model: f"{file_name}_{i}{extension}" for model, (file_name, extension) in outputs.items()}
+
+                if args.dedupe:
+                    level_hash = level.canonical_hash()
+                    if level_hash in generated:
+                        original, original_paths = generated[level_hash]
+                        for model in models:
+                            mappings[model].append({"level": i, "hash": level_hash, "file": original_paths[model]})
+
+                        # Nothing to write, but the message is logged in order with those of the other levels
+                        entries.append([])
+                        yield None, {}, {}, args.force, False, [
+                            (logging.DEBUG, f"Level {i} is a duplicate of level {original}")
+                        ]
+                        continue
+
+                    generated[level_hash] = (i, paths)
+                    for model in models:
+                        mappings[model].append({"level": i, "hash": level_hash, "file": paths[model]})
+
+                outdated, level_entries, records = {}, [], []
+                for model, generator in generators.items():
+                    path, entry = paths[model], model_entry(level, generator)
+                    files = [(path, entry)]
+                    if args.stats:
+                        files.append((stats_path(path), stats_entry(level, generator)))
+
+                    if not args.force and all(is_cached(manifests[model], *file) for file in files):
+                        records.append((logging.DEBUG, f"File '{path}' is up to date"))
+                        continue
+
+                    outdated[model] = generator
+                    level_entries.extend((model, *file) for file in files)
+
+                entries.append(level_entries)
+                if outdated:
+                    yield level, paths, outdated, args.force, args.stats, records
+                else:
+                    yield None, {}, {}, args.force, False, records
+
+        try:
+            # Levels are generated in parallel, the log of every level is written in order once it is done
+            for records in ordered_map(write_models, tasks(), args.jobs):
+                for log_level, message in records:
+                    logging.log(log_level, message)
+
+                for model, path, entry in entries.popleft():
+                    manifests[model][path] = entry
+        finally:
+            # Also written if generation fails, so the files that were written are not generated again
+            for model, (file_name, _) in outputs.items():
+                write_manifest(manifest_path(file_name), manifests[model])
 
-        path = f"{file_name}_{i}{extension}"
-        if os.path.exists(path) and not args.force:
-            logging.warning(f"File '{path}' already exists. Run with the --force flag to overwrite files.")
+        logging.debug(f"Found {count} levels")
 
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w+") as file:
-            file.write(model)
+        if args.dedupe:
+            for model, (file_name, _) in outputs.items():
+                mapping_path = f"{file_name}_mapping.json"
+                with open(mapping_path, "w") as file:
+                    json.dump(mappings[model], file, indent=4)
 
-        logging.debug("Wrote " + path)
+                logging.info(f"Generated {len(generated)} distinct models for {count} levels, mapping written to "
+                             f"'{mapping_path}'")
@@ -0,0 +1,35 @@
+import json
+import logging
+import os.path
+
+from explorer.stats import model_stats, stats_path
+from generator.generator import Generator
+from parser.level import Level
+from util.compression import open_text
+
+
+def write_models(level: Level | None, paths: dict[str, str], generators: dict[str, Generator], force: bool,
+                 stats: bool, records: list[tuple[int, str]]) -> list[tuple[int, str]]:
+    # Writes the model of every generator for a level. This runs in worker processes, so log records are returned as
+    # (log level, message) pairs for the caller to log in order, after the records that were passed in.
+    records = list(records)
+
+    for model, generator in generators.items():
+        path = paths[model]
+        if os.path.exists(path) and not force:
+            records.append((logging.WARNING, f"File '{path}' already exists and is out of date, overwriting it"))
+
+        # Models are written, and compressed, while they are generated
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open_text(path, "w") as file:
+            generator.write_model(level, file)
+
+        records.append((logging.DEBUG, "Wrote " + path))
+
+        if stats:
+            with open(stats_path(path), "w") as file:
+                json.dump(model_stats(level, generator=generator), file, indent=4)
+
+            records.append((logging.DEBUG, "Wrote " + stats_path(path)))
+
+    return records
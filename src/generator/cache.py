@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os.path
+
+from explorer.stats import DEFAULT_LIMIT
+from generator.generator import Generator
+from parser.level import Level
+from util.compression import split_extension
+
+# Increased whenever the statistics written next to a model change
+STATS_VERSION = 2
+
+
+def _key(properties: dict) -> str:
+    return hashlib.sha256(json.dumps(properties, sort_keys=True).encode()).hexdigest()
+
+
+def model_entry(level: Level, generator: Generator) -> dict:
+    # Everything the content of a model file depends on, and the key derived from it
+    properties = {
+        "level": level.digest(),
+        "generator": type(generator).__name__,
+        "version": generator.VERSION,
+        "options": generator.options
+    }
+    return {"key": _key(properties), **properties}
+
+
+def stats_entry(level: Level, generator: Generator) -> dict:
+    # Statistics describe the model of a generator, so they depend on the generator and its options as well
+    properties = {"level": level.digest(), "generator": "model_stats", "version": STATS_VERSION,
+                  "options": {"limit": DEFAULT_LIMIT, "model": type(generator).__name__, **generator.options}}
+    return {"key": _key(properties), **properties}
+
+
+def manifest_path(file_name: str) -> str:
+    return f"{file_name}_manifest.json"
+
+
+def read_manifest(path: str) -> dict[str, dict]:
+    # Output file -> entry of the model or statistics in it. Paths are relative to the manifest.
+    try:
+        with open(path, "r") as file:
+            manifest = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+    directory = os.path.dirname(path)
+    return {os.path.join(directory, name): entry for name, entry in manifest.items()}
+
+
+def write_manifest(path: str, manifest: dict[str, dict]):
+    directory = os.path.dirname(path)
+    os.makedirs(directory or ".", exist_ok=True)
+    with open(path, "w") as file:
+        json.dump({os.path.relpath(name, directory or "."): entry for name, entry in sorted(manifest.items())}, file,
+                  indent=4)
+
+
+def is_cached(manifest: dict[str, dict], path: str, entry: dict) -> bool:
+    # A file is only up to date if it still exists and was generated for the same key
+    return path in manifest and manifest[path]["key"] == entry["key"] and os.path.exists(path)
+
+
+def read_model_entry(model_path: str) -> dict | None:
+    # Entry of a model written by generate_model.py, whose files are named {file_name}_{index}{extension} next to the
+    # manifest of {file_name}. None for models without a manifest.
+    root, _ = split_extension(model_path)
+    manifest = read_manifest(manifest_path(root.rpartition("_")[0]))
+    return manifest.get(model_path)
+
+
+def requires_positive_mu(entry: dict) -> bool:
+    # Collapsed tunnels are only exact for mu > 0, at mu = 0 the player cannot walk through a tunnel
+    return entry["options"].get("collapse_tunnels", False)
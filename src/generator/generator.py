@@ -1,15 +1,219 @@
+import functools
+import io
 import itertools
 from abc import ABC, abstractmethod
+from typing import TextIO, NamedTuple
 
-from parser.level import Level
+from parser.level import Level, TileSet
 
 
 class Generator(ABC):
+    # Increased whenever the output of a generator changes, so that cached models are generated again
+    VERSION = 1
+
+    @property
+    def options(self) -> dict:
+        # Everything a generator is configured with is passed to its constructor and stored as an attribute
+        return dict(vars(self))
 
     @abstractmethod
     def generate_model(self, level: Level) -> str:
         pass
 
+    def write_model(self, level: Level, file: TextIO):
+        # Generators that can write their model incrementally override this
+        file.write(self.generate_model(level))
+
+    def statistics(self, level: Level) -> dict:
+        # Variables and commands (or edges) of the model of a level, and the bits a BDD needs to encode a state.
+        # Generators with another encoding than a position and a boolean per box tile override this.
+        return _statistics(level)
+
+    def merged_tiles(self, level: Level) -> dict[int, int]:
+        # Player positions the model merges into another position, which it has fewer states for
+        return {}
+
+
+class StreamingGenerator(Generator, ABC):
+    # Generators that write their model piece by piece while generating it
+    def generate_model(self, level: Level) -> str:
+        output = io.StringIO()
+        self.write_model(level, output)
+        return output.getvalue()
+
+    @abstractmethod
+    def write_model(self, level: Level, file: TextIO):
+        pass
+
+
+# Steps from a tile per direction: the neighbour and the tile behind it, which is None if it is not reachable.
+# Steps with a tile behind the neighbour can push a box, other steps can only move.
+Steps = dict[str, tuple[int, int | None]]
+
+
+class Transitions(NamedTuple):
+    box_tiles: TileSet
+    # Steps from every reachable tile, in ascending order
+    steps: dict[int, Steps]
+
+
+def _offsets(level: Level) -> dict[str, int]:
+    return {
+        "up": -level.columns,
+        "down": level.columns,
+        "left": -1,
+        "right": 1
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def _transitions(level: Level) -> Transitions:
+    # The transitions every generator renders. Generating several models of a level in a row only builds them once.
+    reachable = set(level.reachable_tiles)
+    steps = {x: {} for x in sorted(reachable)}
+    for d, o in _offsets(level).items():
+        behind = {x: z for x, _, z in _multi_range(*_move_bounds(level, 2 * o), [o, 2 * o], reachable)}
+        for x, y in _multi_range(*_move_bounds(level, o), [o], reachable):
+            steps[x][d] = (y, behind.get(x))
+
+    return Transitions(_box_tiles(level), steps)
+
+
+def _box_tiles(level: Level) -> TileSet:
+    # Tiles that get a box variable. Dead squares only hold a box if it starts there, pushing a box onto one removes it
+    # instead: the goal can no longer be reached either way, as there are not enough boxes left to cover every goal.
+    return TileSet((level.reachable_bits | level.goal_bits) & ~(level.dead_bits & ~level.box_bits))
+
+
+def _position_bits(level: Level) -> int:
+    return (level.last_pos - level.first_pos).bit_length()
+
+
+def _statistics(level: Level) -> dict:
+    # Statistics of a model with a position and a boolean per box tile, and a command per step
+    transitions = _transitions(level)
+    return {
+        "variables": 1 + len(transitions.box_tiles),
+        "commands": sum(len(steps) for steps in transitions.steps.values()),
+        "bdd_bits": _position_bits(level) + len(transitions.box_tiles)
+    }
+
+
+def _box_position_statistics(level: Level) -> dict:
+    # Statistics of a model with a position and a bounded position per box instead of a boolean per box tile
+    statistics = _statistics(level)
+    box_tiles = _transitions(level).box_tiles
+    lower, upper = _box_bounds(level, box_tiles)
+    boxes = len(level.boxes & box_tiles)
+    return {
+        **statistics,
+        "variables": 1 + boxes,
+        "bdd_bits": _position_bits(level) + boxes * (upper - lower).bit_length()
+    }
+
+
+def _collapsed_commands(transitions: Transitions, collapsed: dict[int, int]) -> int:
+    # Commands of a model with collapsed tunnels, which leaves out the moves within a tunnel
+    return sum(1 for x, steps in transitions.steps.items() for y, _ in steps.values()
+               if x not in collapsed or collapsed.get(y, y) != collapsed[x])
+
+
+# Orders in which box variables can be declared. Symbolic engines order their BDD variables by declaration, and
+# variables of tiles that interact should be close to each other.
+ORDERINGS = ("index", "hilbert", "bfs")
+
+
+def _hilbert_index(n: int, x: int, y: int) -> int:
+    # Distance along a Hilbert curve through an n x n grid, n a power of two
+    d, s = 0, n // 2
+    while s > 0:
+        rx, ry = int(x & s > 0), int(y & s > 0)
+        d += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x, y = n - 1 - x, n - 1 - y
+
+            x, y = y, x
+
+        s //= 2
+
+    return d
+
+
+def _variable_order(level: Level, box_tiles: TileSet, ordering: str) -> list[int]:
+    # Box tiles in the order their variables are declared. "index" is row by row, "hilbert" follows a space-filling
+    # curve so that vertical neighbours stay close, and "bfs" starts at the player and visits tiles by distance.
+    if ordering == "hilbert":
+        n = 1 << max(level.rows, level.columns, 1).bit_length()
+        return sorted(box_tiles, key=lambda t: _hilbert_index(n, t % level.columns, t // level.columns))
+
+    if ordering == "bfs":
+        tiles = set(box_tiles) | set(level.reachable_tiles)
+        order, queue = {level.player: 0}, [level.player]
+        for t in queue:
+            for o in _offsets(level).values():
+                if t + o in tiles and t + o not in order:
+                    order[t + o] = len(order)
+                    queue.append(t + o)
+
+        # Goals the player cannot reach come last
+        return sorted(box_tiles, key=lambda t: (order.get(t, len(order)), t))
+
+    return list(box_tiles)
+
+
+def _box_bounds(level: Level, box_tiles: TileSet) -> tuple[int, int]:
+    # Range of a box position variable. If boxes can be pushed onto a dead square, the lower bound marks a removed box.
+    lower = min(box_tiles, default=0)
+    return (lower - 1 if level.reachable_tiles - box_tiles else lower), max(box_tiles, default=0)
+
+
+def _keeps_order(y: int, z: int, box_tiles: TileSet) -> bool:
+    # Moving a box from y to z keeps the box positions sorted if no other box can be between them
+    return not any(min(y, z) < t < max(y, z) for t in box_tiles)
+
+
+def _collapsed_tiles(level: Level, box_tiles: TileSet) -> dict[int, int]:
+    # Maps runs of tunnel tiles that can never hold a box onto their smallest tile. For mu > 0 the player can get from
+    # every tile of such a run to every other one, so only the choices that leave the run matter. Runs are shortened
+    # until a slip back from either end keeps the player in place. At mu = 0 this is not exact, as every move slips.
+    reachable = level.reachable_tiles
+    offsets = (-level.columns, -1, 1, level.columns)
+
+    def outside(t: int) -> list[int]:
+        return [t + o for o in offsets if t + o in reachable and t + o not in tunnel]
+
+    def stays(t: int, neighbor: int) -> bool:
+        # Slipping from t onto a tile without a box, with room to push behind it, does not move the player
+        return neighbor not in box_tiles and 2 * neighbor - t in reachable
+
+    collapsed = {}
+    for tunnel in level.tunnels:
+        path = [outside(tunnel[0])[0], *tunnel, outside(tunnel[-1])[-1]]
+
+        i = 1
+        while i < len(path) - 1:
+            if path[i] in box_tiles:
+                i += 1
+                continue
+
+            j = i
+            while j + 1 < len(path) - 1 and path[j + 1] not in box_tiles:
+                j += 1
+
+            a, b = i, j
+            while a < b and not stays(path[a], path[a - 1]):
+                a += 1
+            while b > a and not stays(path[b], path[b + 1]):
+                b -= 1
+
+            if a < b:
+                collapsed.update((t, min(path[a:b + 1])) for t in path[a:b + 1])
+
+            i = j + 1
+
+    return collapsed
+
 
 def _multi_range(start: int, end: int, offset: list[int], valid: set[int]) -> list:
     return [x for x in zip(range(start, end), *[range(start + o, end + o) for o in offset]) if set(x).issubset(valid)]
@@ -1,11 +1,31 @@
+import functools
+import itertools
 import json
+from abc import ABC
+from dataclasses import dataclass
 from numbers import Number
+from typing import TextIO, Iterator
 
-from generator.generator import Generator, _flatten
-from parser.level import Level, TileType
+from generator.generator import StreamingGenerator, _box_bounds, _keeps_order, _collapsed_tiles, _offsets, \
+    _transitions, _variable_order, Steps, _position_bits, _box_position_statistics, _collapsed_commands
+from parser.level import Level
 
 Identifier = str
-Expr = Identifier | dict | Number | bool
+
+
+@dataclass(frozen=True)
+class _Shared(object):
+    # Subexpression that occurs many times in a model and is only built once. It is written inline, or as a call of the
+    # function with the same name if the model declares functions.
+    function: Identifier
+    args: tuple
+    body: "Expr"
+
+
+Expr = Identifier | dict | Number | bool | _Shared
+
+# Stands in for the edges while the rest of a model is serialized
+_EDGES = "__edges__"
 
 
 def _binary_op(op: str, left: Expr, right: Expr) -> Expr:
@@ -16,12 +36,21 @@ def _binary_op(op: str, left: Expr, right: Expr) -> Expr:
     }
 
 
+def _balanced(op: str, operands: [Expr]) -> Expr:
+    # Balanced tree of an associative operator, so that nesting only grows logarithmically with the number of operands
+    if len(operands) == 1:
+        return operands[0]
+
+    middle = len(operands) // 2
+    return _binary_op(op, _balanced(op, operands[:middle]), _balanced(op, operands[middle:]))
+
+
 def _and(head: Expr, *tail: [Expr]) -> Expr:
-    return head if len(tail) == 0 else _binary_op("∧", head, _and(*tail))
+    return _balanced("∧", [head, *tail])
 
 
-def _or(head, *tail) -> Expr:
-    return head if len(tail) == 0 else _binary_op("∨", head, _and(*tail))
+def _or(head: Expr, *tail: [Expr]) -> Expr:
+    return _balanced("∨", [head, *tail])
 
 
 def _eq(left: Expr, right: Expr) -> Expr:
@@ -48,6 +77,22 @@ def _if(cond: Expr, then: Expr, otherwise: Expr) -> Expr:
     }
 
 
+def _ge(left: Expr, right: Expr) -> Expr:
+    return _binary_op("≥", left, right)
+
+
+def _le(left: Expr, right: Expr) -> Expr:
+    return _binary_op("≤", left, right)
+
+
+def _min(left: Expr, right: Expr) -> Expr:
+    return _binary_op("min", left, right)
+
+
+def _max(left: Expr, right: Expr) -> Expr:
+    return _binary_op("max", left, right)
+
+
 def _sub(left: Expr, right: Expr) -> Expr:
     return _binary_op("-", left, right)
 
@@ -56,7 +101,22 @@ def _div(left: Expr, right: Expr) -> Expr:
     return _binary_op("/", left, right)
 
 
-def _assignment(name: Identifier, value: Expr) -> Expr:
+def _array_access(array: Expr, index: Expr) -> Expr:
+    return {
+        "op": "aa",
+        "exp": array,
+        "index": index
+    }
+
+
+def _array_value(elements: [Expr]) -> Expr:
+    return {
+        "op": "av",
+        "elements": elements
+    }
+
+
+def _assignment(name: Identifier | dict, value: Expr) -> Expr:
     return {
         "ref": name,
         "value": value
@@ -108,11 +168,24 @@ def _location(name: Identifier) -> Expr:
     return {"name": name}
 
 
-def _model(variables: [Expr] = None, constants: [Expr] = None, properties: [Expr] = None, edges: [Expr] = None):
+def _function(name: Identifier, returns: str, parameters: dict[Identifier, str], body: Expr) -> Expr:
+    return {
+        "name": name,
+        "type": returns,
+        "parameters": [{"name": p, "type": t} for p, t in parameters.items()],
+        "body": body
+    }
+
+
+def _model(variables: [Expr] = None, constants: [Expr] = None, properties: [Expr] = None, edges: [Expr] = None,
+           functions: [Expr] = None, features: [str] = None):
+    features = [*(features or []), *(["functions"] if functions else [])]
     return {
         "jani-version": 1,
         "name": "sokoban",
         "type": "mdp",
+        **({"features": features} if features else {}),
+        **({"functions": functions} if functions else {}),
         "variables": variables or [],
         "properties": properties or [],
         "constants": constants or [],
@@ -142,14 +215,170 @@ def _model(variables: [Expr] = None, constants: [Expr] = None, properties: [Expr
     }
 
 
-class JaniNonStochasticGenerator(Generator):
-    def generate_model(self, level: Level) -> str:
-        offsets = {
-            "up": -level.columns,
-            "down": level.columns,
-            "left": -1,
-            "right": 1
-        }
+def _write_model(output: Expr, file: TextIO, compact: bool):
+    # Writes a model with its edges serialized one at a time, so that neither all edges nor the whole output have to be
+    # held in memory. The edges are replaced by a placeholder, every edge is indented like the placeholder.
+    automaton = output["automata"][0]
+    edges = iter(automaton["edges"])
+    first = next(edges, None)
+    automaton["edges"] = [] if first is None else [_EDGES]
+
+    calls = "functions" in output
+
+    def shared(expression: _Shared) -> Expr:
+        return {"op": "call", "function": expression.function, "args": list(expression.args)} if calls \
+            else expression.body
+
+    options = {"separators": (",", ":"), "default": shared} if compact else {"indent": 4, "default": shared}
+    prefix, _, suffix = json.dumps(output, **options).partition(json.dumps(_EDGES))
+    indent = "" if compact else "\n" + prefix[prefix.rindex("\n") + 1:]
+
+    file.write(prefix)
+    for i, edge in enumerate(itertools.chain([first], edges) if first is not None else []):
+        if i > 0:
+            file.write("," + indent)
+
+        file.write(json.dumps(edge, **options).replace("\n", indent))
+
+    file.write(suffix)
+
+
+def _move_command(x: int, y: int, box_tiles: set[int]) -> tuple[Expr, [Expr]]:
+    if y not in box_tiles:
+        return _eq("position", x), [_assignment("position", y)]
+
+    return _and(_eq("position", x), _neg(f"box_{y}")), [_assignment("position", y)]
+
+
+def _push_command(x: int, y: int, z: int, box_tiles: set[int]) -> tuple[Expr, [Expr]]:
+    if y not in box_tiles:
+        return _move_command(x, y, box_tiles)
+
+    # Pushing a box onto a dead square removes it
+    if z not in box_tiles:
+        return _eq("position", x), [_assignment("position", y), _assignment(f"box_{y}", False)]
+
+    return _and(_eq("position", x), _neg(_and(f"box_{y}", f"box_{z}"))), [
+        _assignment("position", y),
+        _assignment(f"box_{y}", False),
+        _assignment(f"box_{z}", _or(f"box_{y}", f"box_{z}"))
+    ]
+
+
+def _move_assignments(y: int, box_tiles: set[int]) -> [Expr]:
+    if y not in box_tiles:
+        return [_assignment("position", y)]
+
+    return [_assignment("position", _if(_neg(f"box_{y}"), y, "position"))]
+
+
+def _push_assignments(y: int, z: int, box_tiles: set[int]) -> [Expr]:
+    # Without a box to push, the player stays in place
+    if y not in box_tiles:
+        return []
+
+    if z not in box_tiles:
+        return [_assignment("position", _if(f"box_{y}", y, "position")), _assignment(f"box_{y}", False)]
+
+    return [
+        _assignment("position", _if(_and(f"box_{y}", _neg(f"box_{z}")), y, "position")),
+        _assignment(f"box_{y}", _and(f"box_{y}", f"box_{z}")),
+        _assignment(f"box_{z}", _or(f"box_{y}", f"box_{z}"))
+    ]
+
+
+def _box_condition(i: Expr, boxes: int) -> Expr:
+    return _or(*[_eq(f"b_{j}", i) for j in range(1, boxes + 1)])
+
+
+@functools.cache
+def _box_at(i: int, boxes: int) -> Expr:
+    # The same expression is used for every occurrence, written inline or as a call of the box function
+    return _Shared("box", (i,), _box_condition(i, boxes)) if boxes > 0 else False
+
+
+def _sorted_push(y: int, z: int, condition: Expr | None, boxes: int, box_tiles: set[int]) -> [Expr]:
+    # Moves the box on y to z. The box variables are kept in ascending order, so if there can be boxes between y and z,
+    # those shift one place.
+    conditions = [condition] if condition is not None else []
+    if _keeps_order(y, z, box_tiles):
+        return [_assignment(f"b_{j}", _if(_and(_eq(f"b_{j}", y), *conditions), z, f"b_{j}"))
+                for j in range(1, boxes + 1)]
+
+    assignments = []
+    for j in range(1, boxes + 1):
+        if z > y:
+            shift = _ge(f"b_{j}", y)
+            value = _min(f"b_{j + 1}", _max(f"b_{j}", z)) if j < boxes else _max(f"b_{j}", z)
+        else:
+            shift = _le(f"b_{j}", y)
+            value = _max(f"b_{j - 1}", _min(f"b_{j}", z)) if j > 1 else _min(f"b_{j}", z)
+
+        assignments.append(_assignment(f"b_{j}", _if(_and(_box_at(y, boxes), *conditions, shift), value, f"b_{j}")))
+
+    return assignments
+
+
+def _sorted_move_command(x: int, y: int, boxes: int, box_tiles: set[int]) -> tuple[Expr, [Expr]]:
+    if y not in box_tiles:
+        return _eq("position", x), [_assignment("position", y)]
+
+    return _and(_eq("position", x), _neg(_box_at(y, boxes))), [_assignment("position", y)]
+
+
+def _sorted_push_command(x: int, y: int, z: int, boxes: int, box_tiles: set[int],
+                         removed: int) -> tuple[Expr, [Expr]]:
+    if y not in box_tiles:
+        return _sorted_move_command(x, y, boxes, box_tiles)
+
+    # Pushing a box onto a dead square removes it
+    if z not in box_tiles:
+        return _eq("position", x), [_assignment("position", y), *_sorted_push(y, removed, None, boxes, box_tiles)]
+
+    return _and(_eq("position", x), _neg(_and(_box_at(y, boxes), _box_at(z, boxes)))), [
+        _assignment("position", y),
+        *_sorted_push(y, z, None, boxes, box_tiles)
+    ]
+
+
+def _sorted_move_assignments(y: int, boxes: int, box_tiles: set[int]) -> [Expr]:
+    if y not in box_tiles:
+        return [_assignment("position", y)]
+
+    return [_assignment("position", _if(_neg(_box_at(y, boxes)), y, "position"))]
+
+
+def _sorted_push_assignments(y: int, z: int, boxes: int, box_tiles: set[int], removed: int) -> [Expr]:
+    # Without a box to push, the player stays in place
+    if y not in box_tiles:
+        return []
+
+    if z not in box_tiles:
+        return [
+            _assignment("position", _if(_box_at(y, boxes), y, "position")),
+            *_sorted_push(y, removed, None, boxes, box_tiles)
+        ]
+
+    return [
+        _assignment("position", _if(_and(_box_at(y, boxes), _neg(_box_at(z, boxes))), y, "position")),
+        *_sorted_push(y, z, _neg(_box_at(z, boxes)), boxes, box_tiles)
+    ]
+
+
+class JaniModelGenerator(StreamingGenerator, ABC):
+    # JANI models are written one edge at a time, optionally without whitespace
+    def __init__(self, compact: bool = False):
+        self.compact = compact
+
+
+class JaniNonStochasticGenerator(JaniModelGenerator):
+    def __init__(self, ordering: str = "index", compact: bool = False):
+        super().__init__(compact)
+        self.ordering = ordering
+
+    def write_model(self, level: Level, file: TextIO):
+        transitions = _transitions(level)
+        box_tiles = transitions.box_tiles
 
         output = _model(
             variables=[
@@ -163,60 +392,58 @@ class JaniNonStochasticGenerator(Generator):
                     },
                     "initial-value": level.player
                 },
-                *self._generate_board(level)
+                *self._generate_board(level, _variable_order(level, box_tiles, self.ordering))
             ],
             properties=[self._generate_property(level)],
-            edges=_flatten([self._generate_edges(i, level, offsets) for i in sorted(level.reachable_tiles)])
+            edges=itertools.chain.from_iterable(self._generate_edges(i, steps, box_tiles)
+                                                for i, steps in transitions.steps.items())
         )
 
-        return json.dumps(output, indent=4)
+        _write_model(output, file, self.compact)
 
     @staticmethod
-    def _generate_board(level: Level) -> [Expr]:
+    def _generate_board(level: Level, order: list[int]) -> [Expr]:
         return [{
             "name": f"box_{i}",
             "type": "bool",
-            "initial-value": level.board[i] == TileType.BOX
-        } for i in sorted(level.reachable_tiles | set(level.goals))]
+            "initial-value": level.is_box(i)
+        } for i in order]
 
     @staticmethod
     def _generate_property(level: Level) -> Expr:
         return _pmax_property("goal_reached", _and(*[_eq(f"box_{goal}", True) for goal in level.goals]))
 
     @staticmethod
-    def _generate_edges(position: int, level: Level, offsets: dict[str, int]) -> [Expr]:
-        def to_move(direction: str, x: int, y: int) -> Expr:
-            return _edge(action=direction,
-                         guard=_and(_eq("position", x), _neg(f"box_{y}")),
-                         destinations=[_destination(location="move", assignments=[_assignment("position", y)])])
-
-        def to_move_and_push(direction: str, x: int, y: int, z: int) -> Expr:
-            return _edge(action=direction,
-                         guard=_and(_eq("position", x), _neg(_and(f"box_{y}", f"box_{z}"))),
-                         destinations=[_destination("move", assignments=[
-                             _assignment("position", y),
-                             _assignment(f"box_{y}", False),
-                             _assignment(f"box_{z}", _or(f"box_{y}", f"box_{z}"))
-                         ])])
-
+    def _generate_edges(position: int, steps: Steps, box_tiles: set[int]) -> [Expr]:
         edges = []
-        for d, o in offsets.items():
-            if position + o in level.reachable_tiles and position + 2 * o in level.reachable_tiles:
-                edges.append(to_move_and_push(d, position, position + o, position + 2 * o))
-            elif position + o in level.reachable_tiles:
-                edges.append(to_move(d, position, position + o))
+        for d, (y, z) in steps.items():
+            if z is not None:
+                guard, assignment = _push_command(position, y, z, box_tiles)
+            else:
+                guard, assignment = _move_command(position, y, box_tiles)
+
+            edges.append(_edge(d, guard, [_destination("move", assignments=assignment)]))
 
         return edges
 
 
-class JaniGenerator(Generator):
-    def generate_model(self, level: Level) -> str:
-        offsets = {
-            "up": -level.columns,
-            "down": level.columns,
-            "left": -1,
-            "right": 1
-        }
+class JaniGenerator(JaniModelGenerator):
+    def __init__(self, collapse_tunnels: bool = False, ordering: str = "index", compact: bool = False):
+        super().__init__(compact)
+        self.collapse_tunnels = collapse_tunnels
+        self.ordering = ordering
+
+    def statistics(self, level: Level) -> dict:
+        return {**super().statistics(level), "commands": _collapsed_commands(_transitions(level),
+                                                                               self.merged_tiles(level))}
+
+    def merged_tiles(self, level: Level) -> dict[int, int]:
+        return _collapsed_tiles(level, _transitions(level).box_tiles) if self.collapse_tunnels else {}
+
+    def write_model(self, level: Level, file: TextIO):
+        transitions = _transitions(level)
+        box_tiles = transitions.box_tiles
+        collapsed = self.merged_tiles(level)
 
         output = _model(
             variables=[
@@ -228,77 +455,165 @@ class JaniGenerator(Generator):
                         "lower-bound": level.first_pos,
                         "upper-bound": level.last_pos
                     },
-                    "initial-value": level.player
+                    "initial-value": collapsed.get(level.player, level.player)
                 },
-                *self._generate_board(level)
+                *self._generate_board(level, _variable_order(level, box_tiles, self.ordering))
             ],
             constants=[{
                 "name": "mu",
                 "type": "real"
             }],
             properties=[self._generate_property(level)],
-            edges=_flatten([self._generate_edges(i, level, offsets) for i in sorted(level.reachable_tiles)])
+            edges=itertools.chain.from_iterable(self._generate_edges(i, steps, box_tiles, collapsed)
+                                                for i, steps in transitions.steps.items())
         )
 
-        return json.dumps(output, indent=4)
+        _write_model(output, file, self.compact)
 
     @staticmethod
-    def _generate_board(level: Level) -> [Expr]:
+    def _generate_board(level: Level, order: list[int]) -> [Expr]:
         return [{
             "name": f"box_{i}",
             "type": "bool",
-            "initial-value": level.board[i] == TileType.BOX
-        } for i in sorted(level.reachable_tiles | set(level.goals))]
+            "initial-value": level.is_box(i)
+        } for i in order]
 
     @staticmethod
     def _generate_property(level: Level) -> Expr:
         return _pmax_property("goal_reached", _and(*[_eq(f"box_{goal}", True) for goal in level.goals]))
 
     @staticmethod
-    def _generate_edges(position: int, level: Level, offsets: dict[str, int]) -> [Expr]:
-        def to_push_assignments(y: int, z: int) -> [Expr]:
-            return [
-                _assignment("position", _if(_and(f"box_{y}", _neg(f"box_{z}")), y, "position")),
-                _assignment(f"box_{y}", _and(f"box_{y}", f"box_{z}")),
-                _assignment(f"box_{z}", _or(f"box_{y}", f"box_{z}"))
-            ]
-
-        def to_move_assignment(y: int) -> [Expr]:
-            return [_assignment("position", _if(_neg(f"box_{y}"), y, "position"))]
+    def _generate_edges(position: int, steps: Steps, box_tiles: set[int],
+                        collapsed: dict[int, int]) -> [Expr]:
+        # Tiles of a collapsed tunnel are replaced by a single position. They never hold a box, so this is only a move.
+        def tile(t: int) -> int:
+            return collapsed.get(t, t)
 
         def to_assignments(direction: str) -> [[Expr]]:
             assignments = []
-            for current_direction, offset in offsets.items():
+            for current_direction, (y, z) in steps.items():
                 if current_direction == direction:
                     continue
 
-                y, z = position + offset, position + 2 * offset
-                if y in level.reachable_tiles and z in level.reachable_tiles:
-                    assignments.append(to_push_assignments(y, z))
-                elif y in level.reachable_tiles:
-                    assignments.append(to_move_assignment(y))
+                if z is not None:
+                    assignments.append(_push_assignments(tile(y), z, box_tiles))
+                else:
+                    assignments.append(_move_assignments(tile(y), box_tiles))
 
             return assignments
 
-        def to_move_command(x: int, y: int) -> tuple[Expr, [Expr]]:
-            return _and(_eq("position", x), _neg(f"box_{y}")), [_assignment("position", y)]
+        edges = []
+        for d, (y, z) in steps.items():
+            # Moves within a collapsed tunnel do not change the state
+            if position in collapsed and tile(y) == collapsed[position]:
+                continue
 
-        def to_push_command(x: int, y: int, z: int) -> tuple[Expr, [Expr]]:
-            return _and(_eq("position", x), _neg(_and(f"box_{y}", f"box_{z}"))), [
-                _assignment("position", y),
-                _assignment(f"box_{y}", False),
-                _assignment(f"box_{z}", _or(f"box_{y}", f"box_{z}"))
-            ]
+            destinations = []
+            if z is not None:
+                guard, assignment = _push_command(tile(position), tile(y), z, box_tiles)
+            else:
+                guard, assignment = _move_command(tile(position), tile(y), box_tiles)
+
+            prob_assignments = to_assignments(d)
+            if len(prob_assignments) == 0:
+                destinations.append(_destination("move", 1, assignment))
+            else:
+                destinations.append(_destination("move", "mu", assignment))
+                prob = _sub(1, "mu") if len(prob_assignments) == 1 else _div(_sub(1, "mu"), len(prob_assignments))
+                destinations += [_destination("move", prob, pa) for pa in prob_assignments]
+
+            edges.append(_edge(d, guard, destinations))
+
+        return edges
+
+
+class JaniPosGenerator(JaniModelGenerator):
+    # Stores the position of every box instead of a boolean per tile, in ascending order to avoid symmetric states.
+    # With functions, whether there is a box on a tile is a call of the box function instead of a disjunction.
+    def __init__(self, functions: bool = False, compact: bool = False):
+        super().__init__(compact)
+        self.functions = functions
+
+    def statistics(self, level: Level) -> dict:
+        return _box_position_statistics(level)
+
+    def write_model(self, level: Level, file: TextIO):
+        transitions = _transitions(level)
+        box_tiles = transitions.box_tiles
+        boxes = len(level.boxes & box_tiles)
+
+        output = _model(
+            variables=[
+                {
+                    "name": "position",
+                    "type": {
+                        "kind": "bounded",
+                        "base": "int",
+                        "lower-bound": level.first_pos,
+                        "upper-bound": level.last_pos
+                    },
+                    "initial-value": level.player
+                },
+                *self._generate_board(level, box_tiles)
+            ],
+            constants=[{
+                "name": "mu",
+                "type": "real"
+            }],
+            properties=[self._generate_property(level, box_tiles)],
+            edges=itertools.chain.from_iterable(self._generate_edges(i, level, steps, box_tiles)
+                                                for i, steps in transitions.steps.items()),
+            functions=[_function("box", "bool", {"i": "int"}, _box_condition("i", boxes))]
+            if self.functions and boxes > 1 else None
+        )
+
+        _write_model(output, file, self.compact)
+
+    @staticmethod
+    def _generate_board(level: Level, box_tiles: set[int]) -> [Expr]:
+        lower, upper = _box_bounds(level, box_tiles)
+        return [{
+            "name": f"b_{j}",
+            "type": {
+                "kind": "bounded",
+                "base": "int",
+                "lower-bound": lower,
+                "upper-bound": upper
+            },
+            "initial-value": i
+        } for j, i in enumerate(sorted(level.boxes & box_tiles), start=1)]
+
+    @staticmethod
+    def _generate_property(level: Level, box_tiles: set[int]) -> Expr:
+        boxes = len(level.boxes & box_tiles)
+        return _pmax_property("goal_reached", _and(*[_box_at(goal, boxes) for goal in level.goals]))
+
+    @staticmethod
+    def _generate_edges(position: int, level: Level, steps: Steps, box_tiles: set[int]) -> [Expr]:
+        boxes = len(level.boxes & box_tiles)
+        removed, _ = _box_bounds(level, box_tiles)
+
+        def to_assignments(direction: str) -> [[Expr]]:
+            assignments = []
+            for current_direction, (y, z) in steps.items():
+                if current_direction == direction:
+                    continue
+
+                if z is not None:
+                    assignments.append(_sorted_push_assignments(y, z, boxes, box_tiles, removed))
+                else:
+                    assignments.append(_sorted_move_assignments(y, boxes, box_tiles))
+
+            return assignments
 
         edges = []
-        for d, o in offsets.items():
+        for d, (y, z) in steps.items():
             destinations = []
-            if position + o in level.reachable_tiles and position + 2 * o in level.reachable_tiles:
-                guard, assignment = to_push_command(position, position + o, position + 2 * o)
-            elif position + o in level.reachable_tiles:
-                guard, assignment = to_move_command(position, position + o)
+            if z is not None:
+                guard, assignment = _sorted_push_command(position, y, z, boxes, box_tiles,
+                                                         removed)
             else:
-                continue
+                guard, assignment = _sorted_move_command(position, y, boxes, box_tiles)
 
             prob_assignments = to_assignments(d)
             if len(prob_assignments) == 0:
@@ -311,3 +626,118 @@ class JaniGenerator(Generator):
             edges.append(_edge(d, guard, destinations))
 
         return edges
+
+
+class JaniArrayGenerator(JaniModelGenerator):
+    # The board is an array with a boolean per tile and the player moves by adding the offset of a direction to the
+    # position, so there is one edge per direction whatever the size of the level. Which tiles are reachable and which
+    # can hold a box, and the number of slip alternatives of every tile, are constant arrays. The arrays start and end
+    # two rows beyond the first and last position, so the tile behind a neighbour of the player is always in bounds.
+    def statistics(self, level: Level) -> dict:
+        # The box array has an element for every tile the arrays span
+        return {
+            "variables": 2,
+            "commands": len(_offsets(level)),
+            "bdd_bits": _position_bits(level) + level.last_pos - level.first_pos + 4 * level.columns + 1
+        }
+
+    def write_model(self, level: Level, file: TextIO):
+        transitions = _transitions(level)
+        box_tiles = transitions.box_tiles
+        reachable = level.reachable_tiles
+        first = level.first_pos - 2 * level.columns
+        tiles = range(first, level.last_pos + 2 * level.columns + 1)
+
+        output = _model(
+            variables=[
+                {
+                    "name": "position",
+                    "type": {
+                        "kind": "bounded",
+                        "base": "int",
+                        "lower-bound": level.first_pos,
+                        "upper-bound": level.last_pos
+                    },
+                    "initial-value": level.player
+                },
+                {
+                    "name": "box",
+                    "type": {
+                        "kind": "array",
+                        "base": "bool"
+                    },
+                    "initial-value": _array_value([t in box_tiles and level.is_box(t) for t in tiles])
+                }
+            ],
+            constants=[
+                {
+                    "name": "mu",
+                    "type": "real"
+                },
+                self._generate_constant("reachable", "bool", [t in reachable for t in tiles]),
+                self._generate_constant("box_tile", "bool", [t in box_tiles for t in tiles]),
+                self._generate_constant("alternatives", "int",
+                                        [max(len(transitions.steps.get(t, {})) - 1, 0) for t in tiles])
+            ],
+            properties=[_pmax_property("goal_reached", _and(*[_array_access("box", goal - first)
+                                                              for goal in level.goals]))],
+            edges=self._generate_edges(_offsets(level), first),
+            features=["arrays"]
+        )
+
+        _write_model(output, file, self.compact)
+
+    @staticmethod
+    def _generate_constant(name: Identifier, base: str, elements: list) -> Expr:
+        return {
+            "name": name,
+            "type": {
+                "kind": "array",
+                "base": base
+            },
+            "value": _array_value(elements)
+        }
+
+    @staticmethod
+    def _generate_edges(offsets: dict[str, int], first: int) -> Iterator[Expr]:
+        def at(array: Identifier, offset: int) -> Expr:
+            # Element of the array for the tile at the offset from the player
+            return _array_access(array, _binary_op("+", "position", offset - first))
+
+        def push(offset: int, condition: Expr) -> [Expr]:
+            # If the condition holds, the player moves by the offset and pushes the box there, if any. A box pushed onto
+            # a dead square is removed.
+            moved = _binary_op("+", "position", offset)
+            pushed = _and(at("reachable", 2 * offset), at("box", offset), at("box_tile", 2 * offset))
+            if condition is True:
+                return [
+                    _assignment("position", moved),
+                    _assignment(at("box", offset), False),
+                    _assignment(at("box", 2 * offset), _or(at("box", 2 * offset), pushed))
+                ]
+
+            return [
+                _assignment("position", _if(condition, moved, "position")),
+                _assignment(at("box", offset), _and(at("box", offset), _neg(condition))),
+                _assignment(at("box", 2 * offset), _or(at("box", 2 * offset), pushed))
+            ]
+
+        alternatives = at("alternatives", 0)
+        for d, offset in offsets.items():
+            y, z = offset, 2 * offset
+            guard = _and(at("reachable", y), _neg(_and(at("box", y), _or(_neg(at("reachable", z)), at("box", z)))))
+            destinations = [_destination("move", _if(_eq(alternatives, 0), 1, "mu"), push(offset, True))]
+
+            # Slipping into a direction in which the player can push moves the box or nothing, otherwise the player
+            # only moves if there is no box. Walls get probability zero and leave the state unchanged.
+            for other, other_offset in offsets.items():
+                if other == d:
+                    continue
+
+                y, z = other_offset, 2 * other_offset
+                moves = _and(at("reachable", y),
+                             _if(at("reachable", z), _and(at("box", y), _neg(at("box", z))), _neg(at("box", y))))
+                probability = _if(at("reachable", y), _div(_sub(1, "mu"), _max(alternatives, 1)), 0)
+                destinations.append(_destination("move", probability, push(other_offset, moves)))
+
+            yield _edge(d, guard, destinations)
@@ -1,154 +1,302 @@
-import textwrap
+import itertools
+from fractions import Fraction
+from typing import TextIO, Iterable, Iterator
 
-from generator.generator import Generator
+from generator.generator import StreamingGenerator, _box_bounds, _keeps_order, _collapsed_tiles, _transitions, \
+    _variable_order, Steps, Transitions, _box_position_statistics, _collapsed_commands
 from generator.string_generators import SokGenerator
-from parser.level import Level, TileType
+from parser.level import Level
 
 STRING_GENERATOR = SokGenerator()
 
 
-def _indent(s: str, n: int = 12) -> str:
-    return s.replace('\n', '\n' + (' ' * n))
-
-
 def _level_to_string(level) -> str:
     return "\n".join(f"// {line}" for line in STRING_GENERATOR.generate_model(level, {}).splitlines())
 
 
-class PrismNonStochasticGenerator(Generator):
-    def generate_model(self, level: Level) -> str:
-        offsets = {
-            "up": -level.columns,
-            "down": level.columns,
-            "left": -1,
-            "right": 1
-        }
+def _write_lines(file: TextIO, lines: Iterable[str], indent: int = 0):
+    for line in lines:
+        file.write(" " * indent + line + "\n" if line.strip() else "\n")
 
-        return textwrap.dedent(f"""
-        {_indent(_level_to_string(level), 8)}
-        mdp
 
-        label "goal_reached" = {"&".join(f"box_{g}=true" for g in level.goals)};
-        
-        module Player
-            position: [{level.first_pos}..{level.last_pos}] init {level.player};
+def _write_program(file: TextIO, level: Level, label: str, declarations: list[str],
+                   sections: Iterable[str | Iterable[str]]):
+    # Writes a PRISM program piece by piece. The sections of the module are separated by a blank line and every section
+    # is written as soon as it has been generated, either as a string or line by line.
+    _write_lines(file, [*_level_to_string(level).split("\n"), "mdp", "", f'label "goal_reached" = {label};', ""])
+    for declaration in declarations:
+        _write_lines(file, [*declaration.split("\n"), ""])
 
-            {_indent(self._generate_board(level))}
+    file.write("module Player\n")
+    for i, section in enumerate(sections):
+        if i > 0:
+            file.write("\n")
 
-            {_indent((chr(10) * 2).join(self._generate_actions(i, level, offsets)
-                                        for i in sorted(level.reachable_tiles)))}
-        endmodule
-        
-        rewards
-            true: 1;
-        endrewards""").strip()
+        _write_lines(file, section.split("\n") if isinstance(section, str) else section, 4)
 
-    @staticmethod
-    def _generate_board(level: Level) -> str:
-        def to_variable(name: str, value: bool) -> str:
-            return f"{name}: bool init {str(value).lower()};"
+    file.write("endmodule\n\nrewards\n    true: 1;\nendrewards")
 
-        return '\n'.join(to_variable(f"box_{i}", level.board[i] == TileType.BOX) for i in
-                         sorted(level.reachable_tiles | set(level.goals)))
 
-    @staticmethod
-    def _generate_actions(position: int, level: Level, offsets: dict[str, int]) -> str:
-        def to_move(direction: str, first_pos: int, second_pos: int) -> str:
-            return f"[{direction}] position={first_pos} & !box_{second_pos} -> (position'={second_pos});"
+def _move_command(direction: str, x: int, y: int, box_tiles: set[int]) -> tuple[str, str]:
+    if y not in box_tiles:
+        return f"[{direction}] position={x}", f"(position'={y})"
 
-        def to_move_and_push(direction: str, x: int, y: int, z: int) -> str:
-            return f"[{direction}] position={x} & !(box_{y} & box_{z}) " \
-                   f"-> (position'={y}) & (box_{y}'=false) & (box_{z}'=box_{y} | box_{z});"
+    return f"[{direction}] position={x} & !box_{y}", f"(position'={y})"
 
-        commands = []
-        for d, o in offsets.items():
-            if position + o in level.reachable_tiles and position + 2 * o in level.reachable_tiles:
-                commands.append(to_move_and_push(d, position, position + o, position + 2 * o))
-            elif position + o in level.reachable_tiles:
-                commands.append(to_move(d, position, position + o))
 
-        return '\n'.join(commands)
+def _push_command(direction: str, x: int, y: int, z: int, box_tiles: set[int]) -> tuple[str, str]:
+    if y not in box_tiles:
+        return _move_command(direction, x, y, box_tiles)
+
+    # Pushing a box onto a dead square removes it
+    if z not in box_tiles:
+        return f"[{direction}] position={x}", f"(position'={y}) & (box_{y}'=false)"
+
+    return f"[{direction}] position={x} & !(box_{y} & box_{z})", \
+           f"(position'={y}) & (box_{y}'=false) & (box_{z}'=box_{y} | box_{z})"
+
+
+def _move_expression(y: int, box_tiles: set[int]) -> str:
+    if y not in box_tiles:
+        return f"(position'={y})"
+
+    return f"(position'=!box_{y} ? {y} : position)"
+
+
+def _push_expression(y: int, z: int, box_tiles: set[int]) -> str:
+    # Without a box to push, the player stays in place
+    if y not in box_tiles:
+        return "true"
+
+    if z not in box_tiles:
+        return f"(position'=box_{y} ? {y} : position) & (box_{y}'=false)"
+
+    return f"(position'=box_{y} & !box_{z} ? {y} : position) " \
+           f"& (box_{y}'=box_{y} & box_{z}) " \
+           f"& (box_{z}'=box_{y} | box_{z})"
+
+
+def _sorted_push(y: int, z: int, condition: str | None, boxes: int, box_tiles: set[int]) -> str:
+    # Moves the box on y to z. The box variables are kept in ascending order, so if there can be boxes between y and z,
+    # those shift one place.
+    conditions = [condition] if condition else []
+    if _keeps_order(y, z, box_tiles):
+        return " & ".join(f"(b_{j}'={' & '.join([f'b_{j}={y}', *conditions])} ? {z} : b_{j})"
+                          for j in range(1, boxes + 1))
+
+    updates = []
+    for j in range(1, boxes + 1):
+        if z > y:
+            shift = f"b_{j}>={y}"
+            value = f"min(b_{j + 1}, max(b_{j}, {z}))" if j < boxes else f"max(b_{j}, {z})"
+        else:
+            shift = f"b_{j}<={y}"
+            value = f"max(b_{j - 1}, min(b_{j}, {z}))" if j > 1 else f"min(b_{j}, {z})"
+
+        updates.append(f"(b_{j}'={' & '.join([f'box_{y}', *conditions, shift])} ? {value} : b_{j})")
+
+    return " & ".join(updates)
+
 
+def _sorted_push_command(direction: str, x: int, y: int, z: int, boxes: int, box_tiles: set[int],
+                         removed: int) -> tuple[str, str]:
+    if y not in box_tiles:
+        return _move_command(direction, x, y, box_tiles)
 
-class PrismGenerator(Generator):
-    def generate_model(self, level: Level) -> str:
-        offsets = {
-            "up": -level.columns,
-            "down": level.columns,
-            "left": -1,
-            "right": 1
-        }
+    # Pushing a box onto a dead square removes it
+    if z not in box_tiles:
+        return f"[{direction}] position={x}", f"(position'={y}) & {_sorted_push(y, removed, None, boxes, box_tiles)}"
 
-        return textwrap.dedent(f"""
-        {_indent(_level_to_string(level), 8)}
-        mdp
+    return f"[{direction}] position={x} & !(box_{y} & box_{z})", \
+           f"(position'={y}) & {_sorted_push(y, z, None, boxes, box_tiles)}"
 
-        label "goal_reached" = {"&".join(f"box_{g}=true" for g in level.goals)};
 
-        const double mu;
+def _sorted_push_expression(y: int, z: int, boxes: int, box_tiles: set[int], removed: int) -> str:
+    # Without a box to push, the player stays in place
+    if y not in box_tiles:
+        return "true"
 
-        module Player
-            position: [{level.first_pos}..{level.last_pos}] init {level.player};
+    if z not in box_tiles:
+        return f"(position'=box_{y} ? {y} : position) & {_sorted_push(y, removed, None, boxes, box_tiles)}"
 
-            {_indent(self._generate_board(level))}
+    return f"(position'=box_{y} & !box_{z} ? {y} : position) " \
+           f"& {_sorted_push(y, z, f'!box_{z}', boxes, box_tiles)}"
 
-            {_indent((chr(10) * 2).join(self._generate_actions(i, level, offsets)
-                                        for i in sorted(level.reachable_tiles)))}
-        endmodule
 
-        rewards
-            true: 1;
-        endrewards""").strip()
+def _position_guard(positions: set[int], parenthesize: bool) -> str:
+    # Runs of consecutive positions become a range
+    runs = []
+    for p in sorted(positions):
+        if runs and runs[-1][1] == p - 1:
+            runs[-1][1] = p
+        else:
+            runs.append([p, p])
+
+    guards = []
+    for first, last in runs:
+        if last - first > 1:
+            guards.append(f"position>={first}&position<={last}")
+        else:
+            guards.extend(f"position={p}" for p in range(first, last + 1))
+
+    if len(guards) == 1:
+        return guards[0]
+
+    guard = "|".join(f"({g})" if "&" in g else g for g in guards)
+    return f"({guard})" if parenthesize else guard
+
+
+def _slip_probability(fraction: Fraction) -> str:
+    if fraction == 1:
+        return "(1-mu)"
+
+    if fraction.numerator == 1:
+        return f"(1-mu)/{fraction.denominator}"
+
+    return f"(1-mu)*{fraction.numerator}/{fraction.denominator}"
+
+
+class PrismNonStochasticGenerator(StreamingGenerator):
+    def __init__(self, ordering: str = "index"):
+        self.ordering = ordering
+
+    def write_model(self, level: Level, file: TextIO):
+        transitions = _transitions(level)
+        box_tiles = transitions.box_tiles
+
+        variables = [
+            f"position: [{level.first_pos}..{level.last_pos}] init {level.player};",
+            self._generate_board(level, _variable_order(level, box_tiles, self.ordering))
+        ]
+        tiles = (self._generate_actions(i, steps, box_tiles) for i, steps in transitions.steps.items())
+
+        # The commands of every tile are written as soon as they have been generated
+        _write_program(file, level, "&".join(f"box_{g}=true" for g in level.goals), [],
+                       itertools.chain(variables, tiles))
 
     @staticmethod
-    def _generate_board(level: Level) -> str:
+    def _generate_board(level: Level, order: list[int]) -> str:
         def to_variable(name: str, value: bool) -> str:
             return f"{name}: bool init {str(value).lower()};"
 
-        return '\n'.join(to_variable(f"box_{i}", level.board[i] == TileType.BOX) for i in
-                         sorted(level.reachable_tiles | set(level.goals)))
+        return '\n'.join(to_variable(f"box_{i}", level.is_box(i)) for i in order)
 
     @staticmethod
-    def _generate_actions(position: int, level: Level, offsets: dict[str, int]) -> str:
-        def to_push_expression(y: int, z: int) -> str:
-            return f"(position'=box_{y} & !box_{z} ? {y} : position) " \
-                   f"& (box_{y}'=box_{y} & box_{z}) " \
-                   f"& (box_{z}'=box_{y} | box_{z})"
+    def _generate_actions(position: int, steps: Steps, box_tiles: set[int]) -> str:
+        commands = []
+        for d, (y, z) in steps.items():
+            if z is not None:
+                guard, expression = _push_command(d, position, y, z, box_tiles)
+            else:
+                guard, expression = _move_command(d, position, y, box_tiles)
+
+            commands.append(f"{guard} -> {expression};")
+
+        return '\n'.join(commands)
 
-        def to_move_expression(y: int) -> str:
-            return f"(position'=!box_{y} ? {y} : position)"
+
+class PrismGenerator(StreamingGenerator):
+    # In compact mode, the player moves relative to its position and the updates that depend on a box are formulas, so
+    # commands with the same effect on different tiles are merged into a single command.
+    def __init__(self, collapse_tunnels: bool = False, compact: bool = False, ordering: str = "index"):
+        self.collapse_tunnels = collapse_tunnels
+        self.compact = compact
+        self.ordering = ordering
+
+    def statistics(self, level: Level) -> dict:
+        transitions, collapsed = _transitions(level), self.merged_tiles(level)
+        if self.compact:
+            commands = len(self._merge_compact_commands(transitions, collapsed)[1])
+        else:
+            commands = _collapsed_commands(transitions, collapsed)
+
+        return {**super().statistics(level), "commands": commands}
+
+    def merged_tiles(self, level: Level) -> dict[int, int]:
+        return _collapsed_tiles(level, _transitions(level).box_tiles) if self.collapse_tunnels else {}
+
+    def write_model(self, level: Level, file: TextIO):
+        transitions = _transitions(level)
+        box_tiles = transitions.box_tiles
+        collapsed = self.merged_tiles(level)
+
+        variables = [
+            f"position: [{level.first_pos}..{level.last_pos}] init {collapsed.get(level.player, level.player)};",
+            self._generate_board(level, _variable_order(level, box_tiles, self.ordering))
+        ]
+        label = "&".join(f"box_{g}=true" for g in level.goals)
+
+        if self.compact:
+            formulas, commands = self._merge_compact_commands(transitions, collapsed)
+
+            declarations = ["const double mu;"]
+            if formulas:
+                declarations.append("\n".join(f"formula {name}={e};" for name, e in formulas.items()))
+
+            _write_program(file, level, label, declarations, [*variables, [
+                f"[{d}] {_position_guard(positions, bool(condition))}{condition}->{update};"
+                for (d, condition, update), positions in commands.items()
+            ]])
+            return
+
+        # Collapsed tunnel tiles have no commands
+        tiles = filter(None, (self._generate_actions(i, steps, box_tiles, collapsed)
+                              for i, steps in transitions.steps.items()))
+
+        # The commands of every tile are written as soon as they have been generated
+        _write_program(file, level, label, ["const double mu;"], itertools.chain(variables, tiles))
+
+    @classmethod
+    def _merge_compact_commands(cls, transitions: Transitions,
+                                collapsed: dict[int, int]) -> tuple[dict[str, str], dict[tuple, set[int]]]:
+        # Formula name -> expression, and (action, condition, update) -> positions of the command
+        formulas, commands = {}, {}
+        for i, steps in transitions.steps.items():
+            for d, x, condition, update in cls._generate_compact_commands(i, steps, transitions.box_tiles, collapsed,
+                                                                          formulas):
+                commands.setdefault((d, condition, update), set()).add(x)
+
+        return formulas, commands
+
+    @staticmethod
+    def _generate_board(level: Level, order: list[int]) -> str:
+        def to_variable(name: str, value: bool) -> str:
+            return f"{name}: bool init {str(value).lower()};"
+
+        return '\n'.join(to_variable(f"box_{i}", level.is_box(i)) for i in order)
+
+    @staticmethod
+    def _generate_actions(position: int, steps: Steps, box_tiles: set[int],
+                          collapsed: dict[int, int]) -> str:
+        # Tiles of a collapsed tunnel are replaced by a single position. They never hold a box, so this is only a move.
+        def tile(t: int) -> int:
+            return collapsed.get(t, t)
 
         def to_expressions(direction: str) -> [str]:
             expressions = []
-            for current_direction, offset in offsets.items():
+            for current_direction, (y, z) in steps.items():
                 if current_direction == direction:
                     continue
 
-                y, z = position + offset, position + 2 * offset
-                if y in level.reachable_tiles and z in level.reachable_tiles:
-                    expressions.append(to_push_expression(y, z))
-                elif y in level.reachable_tiles:
-                    expressions.append(to_move_expression(y))
+                if z is not None:
+                    expressions.append(_push_expression(tile(y), z, box_tiles))
+                else:
+                    expressions.append(_move_expression(tile(y), box_tiles))
 
             probability = "(1-mu)" if len(expressions) == 1 else f"(1-mu)/{len(expressions)}"
             return [f"{probability}:{e}" for e in expressions]
 
-        def to_move_command(direction: str, x: int, y: int) -> tuple[str, str]:
-            return f"[{direction}] position={x} & !box_{y}", f"(position'={y})"
-
-        def to_push_command(direction: str, x: int, y: int, z: int) -> tuple[str, str]:
-            return f"[{direction}] position={x} & !(box_{y} & box_{z})", \
-                   f"(position'={y}) & (box_{y}'=false) & (box_{z}'=box_{y} | box_{z})"
-
         commands = []
-        for d, o in offsets.items():
-            if position + o in level.reachable_tiles and position + 2 * o in level.reachable_tiles:
-                guard, expression = to_push_command(d, position, position + o, position + 2 * o)
-            elif position + o in level.reachable_tiles:
-                guard, expression = to_move_command(d, position, position + o)
-            else:
+        for d, (y, z) in steps.items():
+            # Moves within a collapsed tunnel do not change the state
+            if position in collapsed and tile(y) == collapsed[position]:
                 continue
 
+            if z is not None:
+                guard, expression = _push_command(d, tile(position), tile(y), z, box_tiles)
+            else:
+                guard, expression = _move_command(d, tile(position), tile(y), box_tiles)
+
             exprs = to_expressions(d)
             if len(exprs) == 0:
                 commands.append(f"{guard} -> {expression};")
@@ -157,78 +305,180 @@ class PrismGenerator(Generator):
 
         return '\n'.join(commands)
 
+    @staticmethod
+    def _generate_compact_commands(position: int, steps: Steps, box_tiles: set[int], collapsed: dict[int, int],
+                                   formulas: dict[str, str]) -> Iterator[tuple[str, int, str, str]]:
+        # Yields the action, position, extra guard and updates of every command of a tile, without whitespace.
+        # Expressions that depend on a box are added to the formulas, they are the same for every tile that can step
+        # onto that box.
+        def tile(t: int) -> int:
+            return collapsed.get(t, t)
+
+        x = tile(position)
+
+        def step(y: int) -> str:
+            return f"(position'=position{tile(y) - x:+d})"
+
+        def to_expression(y: int, z: int | None) -> str:
+            if y not in box_tiles:
+                # Without a box to push, the player stays in place
+                return step(y) if z is None else "true"
+
+            if z is None:
+                formulas[f"m_{y}"] = f"!box_{y}?{y}:position"
+                return f"(position'=m_{y})"
+
+            if z not in box_tiles:
+                formulas[f"p_{y}"] = f"box_{y}?{y}:position"
+                return f"(position'=p_{y})&(box_{y}'=false)"
+
+            formulas[f"p_{y}_{z}"] = f"box_{y}&!box_{z}?{y}:position"
+            return f"(position'=p_{y}_{z})&(box_{y}'=box_{y}&box_{z})&(box_{z}'=box_{y}|box_{z})"
+
+        for d, (y, z) in steps.items():
+            # Moves within a collapsed tunnel do not change the state
+            if position in collapsed and tile(y) == x:
+                continue
+
+            if y not in box_tiles:
+                condition, expression = "", step(y)
+            elif z is None:
+                condition, expression = f"&!box_{y}", step(y)
+            elif z not in box_tiles:
+                # Pushing a box onto a dead square removes it
+                condition, expression = "", f"{step(y)}&(box_{y}'=false)"
+            else:
+                condition, expression = f"&!(box_{y}&box_{z})", f"{step(y)}&(box_{y}'=false)&(box_{z}'=box_{y}|box_{z})"
 
-class PrismBGenerator(Generator):
-    def generate_model(self, level: Level) -> str:
-        offsets = {
-            "up": -level.columns,
-            "down": level.columns,
-            "left": -1,
-            "right": 1
-        }
+            # Alternatives with the same effect are merged, their probabilities add up
+            alternatives = {}
+            for other_direction, other in steps.items():
+                if other_direction != d:
+                    e = to_expression(*other)
+                    alternatives[e] = alternatives.get(e, 0) + 1
 
-        return textwrap.dedent(f"""
-        {_indent(_level_to_string(level), 8)}
-        mdp
+            if not alternatives:
+                yield d, x, condition, expression
+                continue
 
-        label "goal_reached" = {"&".join(f"box_{g}=true" for g in level.goals)};
+            count = sum(alternatives.values())
+            yield d, x, condition, f"mu:{expression}+" + "+".join(f"{_slip_probability(Fraction(c, count))}:{e}"
+                                                                  for e, c in alternatives.items())
 
-        const double mu;
 
-        module Player
-            position: [{level.first_pos}..{level.last_pos}] init {level.player};
+class PrismBGenerator(StreamingGenerator):
+    def __init__(self, ordering: str = "index"):
+        self.ordering = ordering
 
-            {_indent(self._generate_board(level))}
+    def write_model(self, level: Level, file: TextIO):
+        transitions = _transitions(level)
+        box_tiles = transitions.box_tiles
 
-            {_indent((chr(10) * 2).join(self._generate_actions(i, level, offsets)
-                                        for i in sorted(level.reachable_tiles)))}
-        endmodule
+        variables = [
+            f"position: [{level.first_pos}..{level.last_pos}] init {level.player};",
+            self._generate_board(level, _variable_order(level, box_tiles, self.ordering))
+        ]
+        tiles = (self._generate_actions(i, steps, box_tiles) for i, steps in transitions.steps.items())
 
-        rewards
-            true: 1;
-        endrewards""").strip()
+        # The commands of every tile are written as soon as they have been generated
+        _write_program(file, level, "&".join(f"box_{g}=true" for g in level.goals), ["const double mu;"],
+                       itertools.chain(variables, tiles))
 
     @staticmethod
-    def _generate_board(level: Level) -> str:
+    def _generate_board(level: Level, order: list[int]) -> str:
         def to_variable(name: str, value: bool) -> str:
             return f"{name}: bool init {str(value).lower()};"
 
-        return '\n'.join(to_variable(f"box_{i}", level.board[i] == TileType.BOX) for i in
-                         sorted(level.reachable_tiles | set(level.goals)))
+        return '\n'.join(to_variable(f"box_{i}", level.is_box(i)) for i in order)
 
     @staticmethod
-    def _generate_actions(position: int, level: Level, offsets: dict[str, int]) -> str:
-        def to_move_expression(y: int) -> str:
-            return f"(position'=!box_{y} ? {y} : position)"
-
+    def _generate_actions(position: int, steps: Steps, box_tiles: set[int]) -> str:
         def to_expressions(direction: str) -> [str]:
             expressions = []
-            for current_direction, offset in offsets.items():
+            for current_direction, (y, _) in steps.items():
                 if current_direction == direction:
                     continue
 
-                y = position + offset
-                if y in level.reachable_tiles:
-                    expressions.append(to_move_expression(y))
+                expressions.append(_move_expression(y, box_tiles))
 
             probability = "(1-mu)" if len(expressions) == 1 else f"(1-mu)/{len(expressions)}"
             return [f"{probability}:{e}" for e in expressions]
 
-        def to_move_command(direction: str, x: int, y: int) -> tuple[str, str]:
-            return f"[{direction}] position={x} & !box_{y}", f"(position'={y})"
+        commands = []
+        for d, (y, z) in steps.items():
+            if z is not None:
+                guard, expression = _push_command(d, position, y, z, box_tiles)
+            else:
+                guard, expression = _move_command(d, position, y, box_tiles)
+
+            exprs = to_expressions(d)
+            if len(exprs) == 0:
+                commands.append(f"{guard} -> {expression};")
+            else:
+                commands.append(f"{guard} -> mu:{expression} + {' + '.join(exprs)};")
+
+        return '\n'.join(commands)
+
+
+class PrismPosGenerator(StreamingGenerator):
+    # Stores the position of every box instead of a boolean per tile, in ascending order to avoid symmetric states.
+    # box_i is a formula that is true if there is a box on tile i.
+    def statistics(self, level: Level) -> dict:
+        return _box_position_statistics(level)
+
+    def write_model(self, level: Level, file: TextIO):
+        transitions = _transitions(level)
+        box_tiles = transitions.box_tiles
+
+        variables = [
+            f"position: [{level.first_pos}..{level.last_pos}] init {level.player};",
+            self._generate_board(level, box_tiles)
+        ]
+        tiles = (self._generate_actions(i, level, steps, box_tiles) for i, steps in transitions.steps.items())
+
+        # The commands of every tile are written as soon as they have been generated
+        _write_program(file, level, "&".join(f"box_{g}=true" for g in level.goals),
+                       ["const double mu;", self._generate_formulas(level, box_tiles)],
+                       itertools.chain(variables, tiles))
+
+    @staticmethod
+    def _generate_formulas(level: Level, box_tiles: set[int]) -> str:
+        boxes = len(level.boxes & box_tiles)
+        return '\n'.join(f"formula box_{i} = {' | '.join(f'b_{j}={i}' for j in range(1, boxes + 1)) or 'false'};"
+                         for i in box_tiles)
+
+    @staticmethod
+    def _generate_board(level: Level, box_tiles: set[int]) -> str:
+        lower, upper = _box_bounds(level, box_tiles)
+        return '\n'.join(f"b_{j}: [{lower}..{upper}] init {i};"
+                         for j, i in enumerate(sorted(level.boxes & box_tiles), start=1))
+
+    @staticmethod
+    def _generate_actions(position: int, level: Level, steps: Steps, box_tiles: set[int]) -> str:
+        boxes = len(level.boxes & box_tiles)
+        removed, _ = _box_bounds(level, box_tiles)
 
-        def to_push_command(direction: str, x: int, y: int, z: int) -> tuple[str, str]:
-            return f"[{direction}] position={x} & !(box_{y} & box_{z})", \
-                   f"(position'={y}) & (box_{y}'=false) & (box_{z}'=box_{y} | box_{z})"
+        def to_expressions(direction: str) -> [str]:
+            expressions = []
+            for current_direction, (y, z) in steps.items():
+                if current_direction == direction:
+                    continue
+
+                if z is not None:
+                    expressions.append(_sorted_push_expression(y, z, boxes, box_tiles, removed))
+                else:
+                    expressions.append(_move_expression(y, box_tiles))
+
+            probability = "(1-mu)" if len(expressions) == 1 else f"(1-mu)/{len(expressions)}"
+            return [f"{probability}:{e}" for e in expressions]
 
         commands = []
-        for d, o in offsets.items():
-            if position + o in level.reachable_tiles and position + 2 * o in level.reachable_tiles:
-                guard, expression = to_push_command(d, position, position + o, position + 2 * o)
-            elif position + o in level.reachable_tiles:
-                guard, expression = to_move_command(d, position, position + o)
+        for d, (y, z) in steps.items():
+            if z is not None:
+                guard, expression = _sorted_push_command(d, position, y, z, boxes,
+                                                         box_tiles, removed)
             else:
-                continue
+                guard, expression = _move_command(d, position, y, box_tiles)
 
             exprs = to_expressions(d)
             if len(exprs) == 0:
@@ -11,16 +11,16 @@ class SokGenerator(Generator):
                 tile = level.board[index]
                 match tile:
                     case TileType.FLOOR:
-                        if index in level.goals and level.player == index:
+                        if level.is_goal(index) and level.player == index:
                             output += "P"
                         elif level.player == index:
                             output += "p"
-                        elif index in level.goals:
+                        elif level.is_goal(index):
                             output += "."
                         else:
                             output += "-"
                     case TileType.BOX:
-                        output += "B" if index in level.goals else "b"
+                        output += "B" if level.is_goal(index) else "b"
                     case TileType.WALL:
                         output += "#"
 
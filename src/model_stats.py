@@ -0,0 +1,84 @@
+import argparse
+import json
+import logging
+import sys
+
+from explorer.stats import model_stats, DEFAULT_LIMIT
+from parser.compiled import CompiledCollection, is_compiled
+from parser.parsers import SokParser, select_levels
+from util.util import exit_with_error
+
+PARSERS = {
+    "sok": SokParser
+}
+
+arg_parser = argparse.ArgumentParser(add_help=False)
+
+required = arg_parser.add_argument_group("required")
+optional = arg_parser.add_argument_group("optional")
+
+optional.add_argument("-i", "--input",
+                      type=str,
+                      help="input file path")
+optional.add_argument("-o", "--output",
+                      type=str,
+                      help="output file path")
+optional.add_argument("-ix", "--indices",
+                      nargs="+",
+                      type=int,
+                      help="space seperated list of level indices. Omit to use all levels")
+optional.add_argument("-p", "--parser",
+                      type=str,
+                      choices=PARSERS.keys(), default="sok",
+                      help="parser type (default: %(default)s)")
+optional.add_argument("-s", "--max-states",
+                      type=int,
+                      default=DEFAULT_LIMIT,
+                      help="number of states to explore before falling back to an upper bound (default: %(default)s)")
+optional.add_argument("--debug",
+                      action="store_true",
+                      help="enable debug logging")
+optional.add_argument("-h", "--help",
+                      action="help",
+                      help="show this help message and exit"
+                      )
+
+args = arg_parser.parse_args()
+
+if args.debug:
+    logging.basicConfig(format="[%(asctime)s] %(levelname)s: %(message)s", level=logging.DEBUG)
+else:
+    logging.basicConfig(format="[%(asctime)s] %(levelname)s: %(message)s")
+
+# Open input
+if args.input is not None:
+    try:
+        in_file = CompiledCollection(args.input) if is_compiled(args.input) else open(args.input, "r")
+    except FileNotFoundError:
+        exit_with_error("File not found: " + args.input)
+else:
+    in_file = sys.stdin
+
+parser = PARSERS[args.parser]()
+logging.debug(f"Using parser: {type(parser)}")
+
+with in_file:
+    try:
+        levels = in_file if isinstance(in_file, CompiledCollection) else parser.iter_levels(in_file)
+        levels = select_levels(levels, args.indices)
+    except IndexError:
+        exit_with_error("Level index out of range")
+
+    results = []
+    for i, level in levels:
+        results.append({"level": i, **model_stats(level, args.max_states)})
+        logging.debug(f"Level {i}: {results[-1]}")
+
+if len(results) == 0:
+    exit_with_error("No parseable levels found in input")
+
+if args.output:
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=4)
+else:
+    print(json.dumps(results, indent=4))
@@ -0,0 +1,111 @@
+import mmap
+import re
+import struct
+from collections.abc import Iterable, Iterator, Sequence
+from typing import BinaryIO
+
+from parser.level import Level
+
+# File layout: header, packed boards, offset index. The header points to the index, which stores the start offset of
+# every level followed by the end offset of the last one, so any level can be located and decoded on its own.
+MAGIC = b"SOKC"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHIQ")  # magic, version, reserved, level count, index offset
+OFFSET = struct.Struct("<Q")
+RECORD = struct.Struct("<HHi")  # rows, columns, player (-1 if absent), followed by rows * columns packed tiles
+
+# A packed tile stores the tile type in the lower two bits and whether it is a goal in the third bit
+GOAL_FLAG = 0b100
+TILE_MASK = bytes(b & ~GOAL_FLAG for b in range(256))
+GOAL_PATTERN = re.compile(rb"[\x04-\x07]")
+
+
+def is_compiled(path: str) -> bool:
+    try:
+        with open(path, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _pack(level: Level) -> bytes:
+    tiles = bytearray(level.tiles)
+    for goal in level.goals:
+        tiles[goal] |= GOAL_FLAG
+
+    player = -1 if level.player is None else level.player
+    return RECORD.pack(level.rows, level.columns, player) + tiles
+
+
+def _unpack(data: bytes | memoryview) -> Level:
+    rows, columns, player = RECORD.unpack_from(data)
+    packed = bytes(data[RECORD.size:RECORD.size + rows * columns])
+
+    goals = [m.start() for m in GOAL_PATTERN.finditer(packed)]
+    return Level(packed.translate(TILE_MASK), None if player < 0 else player, goals, rows, columns)
+
+
+def write_collection(levels: Iterable[Level], file: BinaryIO) -> int:
+    start = file.tell()
+    file.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+
+    offsets = []
+    for level in levels:
+        offsets.append(file.tell() - start)
+        file.write(_pack(level))
+
+    index_offset = file.tell() - start
+    offsets.append(index_offset)
+    file.write(b"".join(OFFSET.pack(o) for o in offsets))
+
+    # Patch the header now that the number of levels and the position of the index are known
+    end = file.tell()
+    file.seek(start)
+    file.write(HEADER.pack(MAGIC, VERSION, 0, len(offsets) - 1, index_offset))
+    file.seek(end)
+
+    return len(offsets) - 1
+
+
+class CompiledCollection(Sequence):
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, self._count, self._index_offset = HEADER.unpack_from(self._data)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Not a compiled level collection: {path}")
+
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported compiled level collection version {version}: {path}")
+
+    def __enter__(self) -> "CompiledCollection":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> Level:
+        if i < 0:
+            i += self._count
+
+        if not 0 <= i < self._count:
+            raise IndexError("level index out of range")
+
+        start, = OFFSET.unpack_from(self._data, self._index_offset + i * OFFSET.size)
+        end, = OFFSET.unpack_from(self._data, self._index_offset + (i + 1) * OFFSET.size)
+
+        with memoryview(self._data)[start:end] as record:
+            return _unpack(record)
+
+    def __iter__(self) -> Iterator[Level]:
+        return (self[i] for i in range(self._count))
+
+    def close(self):
+        self._data.close()
@@ -1,6 +1,6 @@
-from dataclasses import dataclass
+import hashlib
+from collections.abc import Iterable, Iterator, Sequence, Set
 from enum import Enum
-from functools import cached_property
 
 
 class TileType(Enum):
@@ -9,61 +9,309 @@ class TileType(Enum):
     WALL = 2
 
 
-@dataclass
+# Tile types indexed by their value, used to decode the packed board
+TILES = tuple(TileType)
+
+# Packed tile values
+FLOOR, BOX, WALL = (t.value for t in TileType)
+
+
+def _to_bits(indices: Iterable[int]) -> int:
+    bits = 0
+    for i in indices:
+        bits |= 1 << i
+
+    return bits
+
+
+# Read-only view of a packed board that yields a TileType per tile
+class Board(Sequence):
+    __slots__ = ("_tiles",)
+
+    def __init__(self, tiles: bytes):
+        self._tiles = tiles
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [TILES[t] for t in self._tiles[i]]
+
+        return TILES[self._tiles[i]]
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    def __iter__(self) -> Iterator[TileType]:
+        return (TILES[t] for t in self._tiles)
+
+
+# Read-only view of a bitset of tile indices, iterated in ascending order
+class TileSet(Set):
+    __slots__ = ("_bits",)
+
+    def __init__(self, bits: int):
+        self._bits = bits
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[int]) -> set[int]:
+        # Set operations (|, &, -) return regular sets
+        return set(it)
+
+    def __contains__(self, i) -> bool:
+        return isinstance(i, int) and i >= 0 and (self._bits >> i) & 1 == 1
+
+    def __iter__(self) -> Iterator[int]:
+        bits = self._bits
+        while bits:
+            low = bits & -bits
+            yield low.bit_length() - 1
+            bits ^= low
+
+    def __len__(self) -> int:
+        return self._bits.bit_count()
+
+    def __repr__(self) -> str:
+        return f"TileSet({list(self)})"
+
+
 class Level(object):
-    board: list[TileType]
-    player: int
-    goals: list[int]
-    rows: int
-    columns: int
+    __slots__ = ("_tiles", "_player", "_goal_bits", "_box_bits", "_reachable_bits", "_dead_bits", "_rows", "_columns")
+
+    def __init__(self, board: Iterable[TileType] | bytes, player: int, goals: Iterable[int], rows: int, columns: int):
+        self._tiles = bytes(board) if isinstance(board, (bytes, bytearray)) else bytes(t.value for t in board)
+        self._player = player
+        self._goal_bits = _to_bits(goals)
+        self._box_bits = _to_bits(i for i, t in enumerate(self._tiles) if t == BOX)
+        self._reachable_bits = None
+        self._dead_bits = None
+        self._rows = rows
+        self._columns = columns
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Level):
+            return NotImplemented
+
+        return (self._tiles, self._player, self._goal_bits, self._rows, self._columns) == \
+            (other._tiles, other._player, other._goal_bits, other._rows, other._columns)
+
+    def __hash__(self) -> int:
+        return hash((self._tiles, self._player, self._goal_bits, self._rows, self._columns))
+
+    def __repr__(self) -> str:
+        return f"Level(rows={self._rows}, columns={self._columns}, player={self._player}, goals={list(self.goals)})"
+
+    @property
+    def tiles(self) -> bytes:
+        return self._tiles
+
+    @property
+    def board(self) -> Board:
+        return Board(self._tiles)
+
+    @property
+    def player(self) -> int:
+        return self._player
+
+    @property
+    def goals(self) -> TileSet:
+        return TileSet(self._goal_bits)
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+    @property
+    def columns(self) -> int:
+        return self._columns
 
     @property
     def size(self) -> int:
-        return self.rows * self.columns
+        return self._rows * self._columns
+
+    @property
+    def goal_bits(self) -> int:
+        return self._goal_bits
+
+    @property
+    def box_bits(self) -> int:
+        return self._box_bits
+
+    @property
+    def reachable_bits(self) -> int:
+        if self._reachable_bits is None:
+            self._reachable_bits = self._find_reachable()
+
+        return self._reachable_bits
+
+    @property
+    def dead_bits(self) -> int:
+        if self._dead_bits is None:
+            self._dead_bits = self._find_dead()
+
+        return self._dead_bits
 
-    @cached_property
+    @property
     def first_pos(self) -> int:
-        return min(self.reachable_tiles)
+        bits = self.reachable_bits
+        return (bits & -bits).bit_length() - 1
 
-    @cached_property
+    @property
     def last_pos(self) -> int:
-        return max(self.reachable_tiles)
+        return self.reachable_bits.bit_length() - 1
+
+    @property
+    def reachable_tiles(self) -> TileSet:
+        return TileSet(self.reachable_bits)
+
+    @property
+    def boxes(self) -> TileSet:
+        return TileSet(self._box_bits)
+
+    @property
+    def dead_squares(self) -> TileSet:
+        return TileSet(self.dead_bits)
+
+    @property
+    def tunnels(self) -> list[list[int]]:
+        # Maximal chains of reachable tiles with exactly two reachable neighbours, ordered along the chain.
+        # Chains that form a cycle are not tunnels and are skipped.
+        reachable, columns = self.reachable_tiles, self._columns
+        neighbors = {t: [n for n in (t - columns, t - 1, t + 1, t + columns) if n in reachable] for t in reachable}
+        inner = {t for t, n in neighbors.items() if len(n) == 2}
+
+        def walk(previous: int, current: int) -> list[int]:
+            chain = []
+            while current in inner and current != start:
+                chain.append(current)
+                previous, current = current, next(n for n in neighbors[current] if n != previous)
+
+            return chain
+
+        tunnels, visited = [], set()
+        for start in sorted(inner):
+            if start in visited:
+                continue
+
+            backward = walk(start, neighbors[start][0])
+            tunnel = backward[::-1] + [start] + walk(start, neighbors[start][1])
+            visited.update(tunnel)
+
+            # Both walks go all the way around a cycle
+            if len(tunnel) != len(set(tunnel)):
+                continue
+
+            tunnels.append(tunnel)
+
+        return tunnels
+
+    def is_wall(self, i: int) -> bool:
+        return self._tiles[i] == WALL
+
+    def is_box(self, i: int) -> bool:
+        return (self._box_bits >> i) & 1 == 1
+
+    def is_goal(self, i: int) -> bool:
+        return (self._goal_bits >> i) & 1 == 1
+
+    def is_reachable(self, i: int) -> bool:
+        return (self.reachable_bits >> i) & 1 == 1
+
+    def is_dead(self, i: int) -> bool:
+        return (self.dead_bits >> i) & 1 == 1
+
+    def digest(self) -> str:
+        # Hash of the exact level, which changes if anything about it changes, unlike the canonical hash
+        header = f"{self._rows},{self._columns},{self._player},{self._goal_bits:x};".encode()
+        return hashlib.sha256(header + self._tiles).hexdigest()
+
+    def canonical_hash(self) -> str:
+        # Only the reachable area and the goals matter, everything else is treated as wall
+        relevant = self.reachable_bits | self._goal_bits
+        positions = [divmod(i, self._columns) for i in TileSet(relevant)]
+        top, bottom = min(r for r, _ in positions), max(r for r, _ in positions)
+        left, right = min(c for _, c in positions), max(c for _, c in positions)
+
+        def to_char(i: int) -> str:
+            if not (relevant >> i) & 1:
+                return "#"
+
+            if i == self._player:
+                return "+" if self.is_goal(i) else "@"
+
+            if self.is_box(i):
+                return "*" if self.is_goal(i) else "$"
+
+            return "." if self.is_goal(i) else "-"
+
+        # Board trimmed to the bounding box of the relevant tiles
+        grid = [[to_char(r * self._columns + c) for c in range(left, right + 1)] for r in range(top, bottom + 1)]
+
+        # The 8 symmetries are the 4 rotations of the board and of its mirror image
+        variants = []
+        for variant in (grid, [list(row) for row in zip(*grid)]):
+            for _ in range(4):
+                variant = [list(row) for row in zip(*variant[::-1])]
+                variants.append("\n".join("".join(row) for row in variant))
+
+        return hashlib.sha256(min(variants).encode()).hexdigest()
+
+    def _find_dead(self) -> int:
+        reachable = self.reachable_bits
+
+        # With more boxes than goals, a box can rest anywhere without blocking the goal
+        if (self._box_bits & reachable).bit_count() > self._goal_bits.bit_count():
+            return 0
+
+        # Pull boxes backwards from the goals: a box can be pulled from b to b + o if the player can stand on b + o
+        # and step back onto b + 2 * o. Every square a box can be pulled to can still reach a goal.
+        offsets = (-self._columns, self._columns, -1, 1)
+        live = self._goal_bits & reachable
+        stack = list(TileSet(live))
+
+        while stack:
+            current = stack.pop()
+            for o in offsets:
+                target, player = current + o, current + 2 * o
+                # Both tiles have to be on the board before they can be looked up, a goal can be on the top row
+                if target < 0 or player < 0 or target >= self.size or player >= self.size:
+                    continue
+
+                if (live >> target) & 1 or not (reachable >> target) & 1 or not (reachable >> player) & 1:
+                    continue
+
+                live |= 1 << target
+                stack.append(target)
+
+        return reachable & ~live
+
+    def _find_reachable(self) -> int:
+        tiles, columns, size = self._tiles, self._columns, self.size
 
-    @cached_property
-    def reachable_tiles(self) -> set[int]:
         def _neighbors(pos: int) -> list[int]:
             neighbors = []
 
-            if pos >= self.columns and not self.is_wall(current - self.columns):
-                neighbors.append(current - self.columns)
+            if pos >= columns and tiles[pos - columns] != WALL:
+                neighbors.append(pos - columns)
 
-            if pos <= self.size - self.columns and not self.is_wall(current + self.columns):
-                neighbors.append(current + self.columns)
+            if pos + columns < size and tiles[pos + columns] != WALL:
+                neighbors.append(pos + columns)
 
-            if pos >= 1 and not self.is_wall(current - 1):
-                neighbors.append(current - 1)
+            if pos >= 1 and tiles[pos - 1] != WALL:
+                neighbors.append(pos - 1)
 
-            if pos <= self.size - 1 and not self.is_wall(current + 1):
-                neighbors.append(current + 1)
+            if pos + 1 < size and tiles[pos + 1] != WALL:
+                neighbors.append(pos + 1)
 
             return neighbors
 
-        stack, path = [self.player], set()
+        stack, visited = [self._player], bytearray(size)
 
         while stack:
             current = stack.pop()
-            if current in path:
+            if visited[current]:
                 continue
 
-            path.add(current)
+            visited[current] = 1
 
             stack.extend(_neighbors(current))
 
-        return path
-
-    @cached_property
-    def boxes(self) -> set[int]:
-        return {i for i, t in enumerate(self.board) if t == TileType.BOX}
-
-    def is_wall(self, i: int) -> bool:
-        return self.board[i] == TileType.WALL
+        return _to_bits(i for i, v in enumerate(visited) if v)
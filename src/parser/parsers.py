@@ -1,17 +1,51 @@
+import io
+import itertools
+import re
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Sequence
+from typing import Iterator, TextIO
 
 from parser.level import Level, TileType
 
 
+def select_levels(levels: Iterable[Level], indices: list[int] | None) -> Iterable[tuple[int, Level]]:
+    # Yields the index and level of every requested level. Negative indices are converted to absolute ones, so output
+    # files of a level are named after the same index however it was requested
+    if indices is None:
+        return enumerate(levels)
+
+    if isinstance(levels, Sequence):
+        # Random access, only the requested levels are decoded
+        return [(range(len(levels))[ix], levels[ix]) for ix in indices]
+
+    if any(ix < 0 for ix in indices):
+        # Negative indices are relative to the end of the collection, so all levels have to be read
+        levels = list(levels)
+        indices = [range(len(levels))[ix] for ix in indices]
+    else:
+        # Only keep the requested levels and stop reading once the last one has been parsed
+        wanted = set(indices)
+        levels = {i: level for i, level in enumerate(itertools.islice(levels, max(wanted) + 1)) if i in wanted}
+
+    try:
+        return [(ix, levels[ix]) for ix in indices]
+    except KeyError as e:
+        raise IndexError("level index out of range") from e
+
+
 class Parser(ABC):
 
     @abstractmethod
-    def parse_levels(self, text: str) -> list[Level]:
+    def iter_levels(self, stream: TextIO) -> Iterator[Level]:
         pass
 
+    def parse_levels(self, text: str) -> list[Level]:
+        return list(self.iter_levels(io.StringIO(text)))
+
 
 class SimpleSokParser(Parser):
-    def parse_levels(self, text: str) -> list[Level]:
+    def iter_levels(self, stream: TextIO) -> Iterator[Level]:
+        text = stream.read()
         board = []
         player = None
         goals = []
@@ -34,7 +68,7 @@ class SimpleSokParser(Parser):
         rows = len(text.split('\n'))
         columns = len(text.split('\n')[0])
 
-        return [Level(board, player, goals, rows, columns)]
+        yield Level(board, player, goals, rows, columns)
 
 
 class SokParser(Parser):
@@ -59,102 +93,80 @@ class SokParser(Parser):
     # All valid board characters, including RLE characters and alternative line separators
     BOARD_CHARS = TILE_CHARS | RLE_DIGIT | {RLE_GROUP_OPEN, RLE_GROUP_CLOSE} | {LINE_SEP}
 
-    # Comment lines
-    COMMENT = "::"
+    # Translation table from tile characters to packed tile values
+    TILE_TABLE = str.maketrans(dict.fromkeys(TILE_FLOOR, chr(TileType.FLOOR.value))
+                               | dict.fromkeys(TILE_BOX, chr(TileType.BOX.value))
+                               | dict.fromkeys(TILE_WALL, chr(TileType.WALL.value)))
 
-    def parse_levels(self, text: str) -> list[Level]:
-        levels = []
+    # Patterns matching goal and pusher characters
+    GOAL_PATTERN = re.compile(f"[{re.escape(''.join(TILE_GOAL))}]")
+    PUSHER_PATTERN = re.compile(f"[{re.escape(''.join(TILE_PUSHER))}]")
 
-        lines = text.splitlines()
-        i = 0
+    # Translation table that deletes every board character, so a line is a board line iff nothing remains
+    BOARD_CHARS_TABLE = str.maketrans("", "", "".join(BOARD_CHARS))
 
-        # Remove comments
-        lines = [line for line in lines if not line.startswith(self.COMMENT)]
+    # RLE tokens: counted group open, group close, counted tile, run of plain tiles and anything else (invalid)
+    RLE_TOKEN = re.compile(r"(\d*)\(|(\))|(\d+)([^\d()])|([^\d()]+)|(.)")
 
-        while True:
-            # Skip titles and other text
-            i = self._consume_until_board(lines, i)
+    # Comment lines
+    COMMENT = "::"
 
-            # Check if the end is reached
-            if i == len(lines):
-                break
+    def iter_levels(self, stream: TextIO) -> Iterator[Level]:
+        input_board = []
 
-            # Normalize board
-            input_board = []
-            while i < len(lines):
-                result, line = self._parse_board_line(lines[i])
-                if not result:
-                    break
+        for line in stream:
+            line = line.rstrip("\r\n")
 
-                input_board.extend(line.split(self.LINE_SEP))
-                i += 1
+            # Skip comments
+            if line.startswith(self.COMMENT):
+                continue
 
-            levels.append(self._parse_board(input_board))
+            # Titles and other text close the current board
+            result, line = self._parse_board_line(line)
+            if not result:
+                if input_board:
+                    yield self._parse_board(input_board)
+                    input_board = []
 
-        return levels
+                continue
 
-    def _consume_until_board(self, lines: list[str], i: int = 0) -> int:
-        while i < len(lines) and not self._parse_board_line(lines[i])[0]:
-            i += 1
+            # Normalize board
+            input_board.extend(line.split(self.LINE_SEP))
 
-        return i
+        if input_board:
+            yield self._parse_board(input_board)
 
     def _parse_board(self, lines: list[str]) -> Level:
         rows, columns = len(lines), max(len(line) for line in lines)
 
         # Pad lines with spaces (floor tiles) to be equal length
-        input_board = [line.ljust(columns) for line in lines]
+        input_board = "".join(line.ljust(columns) for line in lines)
 
-        board = []
-        pusher = None
-        goals = []
-
-        for i, line in enumerate(input_board):
-            for j, c in enumerate(line):
-                # Store goals
-                if c in self.TILE_GOAL:
-                    goals.append(i * columns + j)
-
-                # Store pusher position
-                if c in self.TILE_PUSHER:
-                    pusher = i * columns + j
-
-                # Convert character to tile
-                if c in self.TILE_FLOOR:
-                    board.append(TileType.FLOOR)
-
-                if c in self.TILE_BOX:
-                    board.append(TileType.BOX)
+        # Store goals and pusher position
+        goals = [m.start() for m in self.GOAL_PATTERN.finditer(input_board)]
+        pusher = max((m.start() for m in self.PUSHER_PATTERN.finditer(input_board)), default=None)
 
-                if c in self.TILE_WALL:
-                    board.append(TileType.WALL)
+        # Convert characters to tiles
+        board = input_board.translate(self.TILE_TABLE).encode("latin-1")
 
         return Level(board, pusher, goals, rows, columns)
 
     def _parse_board_line(self, input_line: str) -> tuple[bool, str]:
         # Check if line contains only board characters
-        if not set(input_line).issubset(self.BOARD_CHARS):
+        if input_line.translate(self.BOARD_CHARS_TABLE):
             return False, ""
 
         # Decode RLE
-        output_line = ""
-        i = 0
-        while i < len(input_line):
-            c = input_line[i]
-            if c in self.RLE_DIGIT:
-                i, num = self._parse_rle_digit(i, input_line)
-                i, value = self._parse_rle_group(num, i, input_line)
-                output_line += value
-            else:
-                output_line += c
-                i += 1
+        output_line = self._decode_rle(input_line)
+        if output_line is None:
+            return False, ""
 
         # Strip trailing |
         if len(output_line) > 0 and output_line[-1] == self.LINE_SEP:
             output_line = output_line[:-1]
 
         # Check if line starts and ends with box on goal tile or wall tile
-        s_line = output_line.strip(str(self.TILE_EMPTY))
+        s_line = output_line.strip("".join(self.TILE_EMPTY))
         if len(s_line) == 0:
             return False, ""
 
@@ -168,32 +180,30 @@ class SokParser(Parser):
 
         return True, output_line
 
-    def _parse_rle_digit(self, i: int, line: str) -> tuple[int, int]:
-        digit = ""
-        while (char := line[i]) in self.RLE_DIGIT:
-            digit += char
-            i += 1
-
-        return i, int(digit)
-
-    def _parse_rle_group(self, num: int, i: int, line: str) -> tuple[int, str]:
-        scope = 0
-        value = ""
-
-        while True:
-            if line[i] == self.RLE_GROUP_OPEN:
-                scope += 1
-            elif line[i] == self.RLE_GROUP_CLOSE:
-                scope -= 1
-
-            value += line[i]
-            i += 1
-
-            if scope == 0:
-                break
+    def _decode_rle(self, line: str) -> str | None:
+        # Chunks of the innermost open group, and the repeat count and chunks of every enclosing group
+        chunks, stack = [], []
+
+        for group_count, group_close, tile_count, tile, tiles, invalid in self.RLE_TOKEN.findall(line):
+            if tiles:
+                chunks.append(tiles)
+            elif tile:
+                chunks.append(tile * int(tile_count))
+            elif group_close:
+                if not stack:
+                    return None
+
+                count, parent = stack.pop()
+                parent.append("".join(chunks) * count)
+                chunks = parent
+            elif invalid:
+                return None
+            else:
+                stack.append((int(group_count or 1), chunks))
+                chunks = []
 
-        # Trim open and close chars
-        if len(value) > 1:
-            value = value[1:-1]
+        # Unclosed groups are not valid RLE
+        if stack:
+            return None
 
-        return i, self._parse_board_line(value * num)[1]
\ No newline at end of file
+        return "".join(chunks)
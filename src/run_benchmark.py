@@ -1,20 +1,27 @@
 import argparse
 import decimal
 import glob
-import json
 import logging
 import os
+import queue
 import re
 import subprocess
 from collections import defaultdict, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 
+from explorer.stats import read_stats, estimated_states, minimum_states
+from generator.cache import read_model_entry, requires_positive_mu
+from util.compression import SharedStaging, STAGING_DIRECTORY
+from util.results import open_store
 from util.util import exit_with_error, convert_size
 
 
-def run_process(command: [str], timeout: int) -> (bool, str):
+def run_process(command: [str], timeout: int, cpus: [int] = None) -> (bool, str):
+    # Pinned processes only run on the given CPUs, so that concurrent benchmarks do not compete for the same cores
+    pinning = ["taskset", "-c", ",".join(str(cpu) for cpu in cpus)] if cpus else []
     try:
-        return True, subprocess.run(["/usr/bin/time", "-v"] + command,
+        return True, subprocess.run(pinning + ["/usr/bin/time", "-v"] + command,
                                     stdout=subprocess.PIPE,
                                     stderr=subprocess.STDOUT,
                                     timeout=timeout,
@@ -25,12 +32,13 @@ def run_process(command: [str], timeout: int) -> (bool, str):
         return False, str(e.stdout)
 
 
-def run_prism(model: str, mu: str, engine: str, timeout: int, mem_limit: int, property: str) -> (dict, str):
+def run_prism(model: str, mu: str, engine: str, timeout: int, mem_limit: int, property: str,
+              cpus: [int] = None) -> (dict, str):
     success, log = run_process(["prism", model,
                                 f"-{engine}",
                                 "-javamaxmem", str(mem_limit), "-cuddmaxmem", str(mem_limit),
                                 "-pf", property,
-                                "-const", f"mu={mu}"], timeout)
+                                "-const", f"mu={mu}"], timeout, cpus)
 
     if not success:
         return to_failure(model, mu, "timeout"), log
@@ -41,12 +49,13 @@ def run_prism(model: str, mu: str, engine: str, timeout: int, mem_limit: int, pr
     return to_success(model, mu, log), log
 
 
-def run_storm(model: str, mu: str, engine: str, timeout: int, mem_limit: int, property: str) -> (dict, str):
+def run_storm(model: str, mu: str, engine: str, timeout: int, mem_limit: int, property: str,
+              cpus: [int] = None) -> (dict, str):
     success, log = run_process(["storm", "--jani", model,
                                 "-e", engine,
                                 "--janiproperty", property,
                                 "-const", f"mu={mu}",
-                                "--timemem"], timeout)
+                                "--timemem"], timeout, cpus)
 
     if not success:
         return to_failure(model, mu, "timeout"), log
@@ -54,11 +63,12 @@ def run_storm(model: str, mu: str, engine: str, timeout: int, mem_limit: int, pr
     return to_success(model, mu, log), log
 
 
-def run_modest(model: str, mu: str, engine: str, timeout: int, mem_limit: int, property: str) -> (dict, str):
+def run_modest(model: str, mu: str, engine: str, timeout: int, mem_limit: int, property: str,
+               cpus: [int] = None) -> (dict, str):
     success, log = run_process(["modest", engine, model,
                                 "--props", property,
                                 "-E", f"mu={mu}",
-                                "-S", "Memory"], timeout)
+                                "-S", "Memory"], timeout, cpus)
 
     if not success:
         return to_failure(model, mu, "timeout"), log
@@ -66,6 +76,12 @@ def run_modest(model: str, mu: str, engine: str, timeout: int, mem_limit: int, p
     return to_success(model, mu, log), log
 
 
+def benchmark_order(path: str) -> tuple:
+    # Models with statistics are run first, smallest estimated state space first. Other models are ordered by name.
+    stats = read_stats(path)
+    return (0, estimated_states(stats)) if stats else (1, len(path))
+
+
 def to_success(file: str, mu: str, log: str) -> dict:
     timestamp = re.search(r"Elapsed \(wall clock\) time \(h:mm:ss or m:ss\): (.*)", log).group(1)
     time = sum(float(p) * 60 ** i for i, p in enumerate(reversed(timestamp.split(":"))))
@@ -99,7 +115,8 @@ required.add_argument("input",
                       help="input path. Supports glob patterns to run multiple files")
 required.add_argument("output",
                       type=str,
-                      help="output result file path")
+                      help="output result file path. Results are appended to a .jsonl file or a .db SQLite "
+                           "database, other files are a JSON array")
 required.add_argument("-c", "--checker",
                       type=str,
                       required=True,
@@ -127,7 +144,24 @@ optional.add_argument("-m", "--memory",
                       type=int,
                       default=6144,
                       help="memory limit (in MB) (default: %(default)s)")
-
+optional.add_argument("-s", "--max-states",
+                      type=int,
+                      help="skip models whose statistics show more reachable states")
+optional.add_argument("-j", "--jobs",
+                      type=int,
+                      default=1,
+                      help="number of benchmarks to run in parallel (default: %(default)s)")
+optional.add_argument("--total-memory",
+                      type=int,
+                      help="memory (in MB) that parallel benchmarks may use together. Only as many benchmarks run in "
+                           "parallel as their memory limits fit in (default: physical memory)")
+optional.add_argument("--pin",
+                      action="store_true",
+                      help="pin every parallel benchmark to its own share of the CPUs with taskset")
+optional.add_argument("--staging",
+                      type=str,
+                      default=STAGING_DIRECTORY,
+                      help="directory to decompress .gz and .xz models to before running them (default: %(default)s)")
 optional.add_argument("-l", "--log",
                       type=str,
                       help="output log file path")
@@ -160,23 +194,34 @@ except (decimal.InvalidOperation, ValueError):
 logging.info(f"Benchmarking with mu values: {[str(mu) for mu in mus]}")
 
 # Check for existing benchmark results
-try:
-    with open(args.output, 'r') as output_file:
-        skipped_benchmarks = defaultdict(set)
-        for b in json.loads(output_file.read() or "[]"):
-            skipped_benchmarks[b["file"]].add(b["mu"])
-
-        logging.info(f"Found {len(skipped_benchmarks)} existing benchmarks. These will not be ran again.")
-except FileNotFoundError:
-    skipped_benchmarks = {}
+store = open_store(args.output)
+skipped_benchmarks = defaultdict(set)
+for file, mu in store.keys():
+    skipped_benchmarks[file].add(mu)
+
+if skipped_benchmarks:
+    logging.info(f"Found {len(skipped_benchmarks)} existing benchmarks. These will not be ran again.")
+else:
     logging.debug("No existing benchmarks found.")
 
 # Generate benchmarks that still have to be run
 benchmarks = OrderedDict()
-for path in sorted(glob.glob(args.input), key=len):
-    for mu in mus:
+for path in sorted(glob.glob(args.input), key=benchmark_order):
+    stats = read_stats(path)
+    if args.max_states is not None and stats and minimum_states(stats) > args.max_states:
+        logging.info(f"Skipping {path}: more than {args.max_states} reachable states")
+        continue
+
+    # A model that is only exact for mu > 0 would silently give a wrong result at mu = 0
+    entry = read_model_entry(path)
+    exact_mus = mus
+    if entry and requires_positive_mu(entry) and any(Decimal(mu) == 0 for mu in mus):
+        logging.warning(f"Skipping {path} with mu=0: models with collapsed tunnels are only exact for mu > 0")
+        exact_mus = [mu for mu in mus if Decimal(mu) != 0]
+
+    for mu in exact_mus:
         if path not in skipped_benchmarks or mu not in skipped_benchmarks[path]:
-            benchmarks.setdefault(path, set()).add(str(mu))
+            benchmarks.setdefault(path, []).append(mu)
 
 if len(benchmarks) == 0:
     exit_with_error("No files found to benchmark")
@@ -194,39 +239,73 @@ match args.checker:
     case _:
         exit_with_error("Cannot create benchmark runner")
 
-i = 0
-total_len = sum((len(v) for v in benchmarks.values()))
+if args.jobs < 1:
+    exit_with_error("The number of jobs must be at least 1")
 
-for benchmark_file, benchmark_mus in benchmarks.items():
-    for mu in benchmark_mus:
-        i += 1
+# Every benchmark may use up to its memory limit, so only as many run in parallel as fit in the total memory.
+# A single benchmark always runs.
+total_memory = args.total_memory if args.total_memory is not None \
+    else convert_size(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES"), "B", "MB")
 
-        logging.info(f"[{i}/{total_len}] Running {benchmark_file} with mu={mu} "
-                     + "(Time remaining: {:.0f}h {:.0f}m)".format(*divmod((total_len - i) * args.timeout / 60, 60)))
+workers = max(min(args.jobs, total_memory // args.memory), 1)
+if workers < args.jobs:
+    logging.info(f"Running {workers} benchmarks in parallel to stay within {total_memory}MB of memory")
 
-        result, log = runner(benchmark_file, mu, args.engine, args.timeout, max_memory, args.property)
+# Pinned benchmarks run on a share of the available CPUs, which is handed to the next benchmark when they finish
+cpu_shares = queue.Queue()
+cpus = sorted(os.sched_getaffinity(0))
+if args.pin and len(cpus) < workers:
+    exit_with_error(f"Cannot pin {workers} parallel benchmarks to {len(cpus)} CPUs")
 
-        logging.debug(log)
-        logging.debug(result)
+share = len(cpus) // workers
+for w in range(workers):
+    cpu_shares.put(cpus[w * share:(w + 1) * share] if args.pin else None)
 
-        if result["solved"]:
-            logging.info(f"Completed benchmark in {result['time']}s")
-        else:
-            logging.info(f"Canceled: {result['reason']}")
+runs = [(benchmark_file, mu) for benchmark_file, benchmark_mus in benchmarks.items() for mu in benchmark_mus]
+total_len = len(runs)
 
-        os.makedirs(os.path.dirname(args.output), exist_ok=True)
-        try:
-            with open(args.output, "r") as output_file:
-                results = json.loads(output_file.read() or "[]")
-        except FileNotFoundError:
-            results = []
 
-        results.append(result)
+def run_benchmark(i: int, benchmark_file: str, mu: str) -> (dict, str):
+    cpu_share = cpu_shares.get()
+    try:
+        # Compressed models are decompressed once for all values of mu
+        with staging.staged(benchmark_file) as model_file:
+            remaining = (total_len - i) * args.timeout / workers / 60
+            logging.info(f"[{i}/{total_len}] Running {benchmark_file} with mu={mu} "
+                         + "(Time remaining: {:.0f}h {:.0f}m)".format(*divmod(remaining, 60)))
 
-        with open(args.output, "w") as output_file:
-            json.dump(results, output_file, indent=4)
+            result, log = runner(model_file, mu, args.engine, args.timeout, max_memory, args.property, cpu_share)
+    finally:
+        cpu_shares.put(cpu_share)
 
-        if args.log:
-            os.makedirs(os.path.dirname(args.log), exist_ok=True)
-            with open(args.log, "a") as log_file:
-                log_file.write(log)
+    # Results refer to the model that was given, not to its staged copy
+    result["file"] = benchmark_file
+    return result, log
+
+
+with store, SharedStaging({f: len(m) for f, m in benchmarks.items()}, args.staging) as staging, \
+        ThreadPoolExecutor(workers) as executor:
+    futures = [executor.submit(run_benchmark, i, f, mu) for i, (f, mu) in enumerate(runs, start=1)]
+    try:
+        # Results are written in the order of the benchmarks, whichever finishes first
+        for future in futures:
+            result, log = future.result()
+
+            logging.debug(log)
+            logging.debug(result)
+
+            if result["solved"]:
+                logging.info(f"Completed benchmark of {result['file']} with mu={result['mu']} in {result['time']}s")
+            else:
+                logging.info(f"Canceled benchmark of {result['file']} with mu={result['mu']}: {result['reason']}")
+
+            store.append(result)
+
+            if args.log:
+                os.makedirs(os.path.dirname(args.log), exist_ok=True)
+                with open(args.log, "a") as log_file:
+                    log_file.write(log)
+    finally:
+        # After an interruption, benchmarks that did not start yet are not started anymore
+        for future in futures:
+            future.cancel()
@@ -1,12 +1,14 @@
 import argparse
 import glob
-import json
 import logging
 import os
 import re
 import subprocess
 import time
 
+from generator.cache import read_model_entry, requires_positive_mu
+from util.compression import staged, STAGING_DIRECTORY
+from util.results import open_store
 from util.util import exit_with_error, convert_size
 
 PATTERN_SCIFLOAT = r"(\d+(?:.\d+)?(?:[eE]-?\d+)?)"
@@ -57,7 +59,8 @@ required.add_argument("input",
                       help="input path. Supports glob patterns to run multiple files")
 required.add_argument("output",
                       type=str,
-                      help="output result file path")
+                      help="output result file path. Results are appended to a .jsonl file or a .db SQLite "
+                           "database, other files are a JSON array")
 required.add_argument("-mu",
                       type=str,
                       required=True,
@@ -74,6 +77,10 @@ optional.add_argument("-m", "--memory",
                       type=int,
                       default=6144,
                       help="memory limit (in MB) (default: %(default)s)")
+optional.add_argument("--staging",
+                      type=str,
+                      default=STAGING_DIRECTORY,
+                      help="directory to decompress .gz and .xz models to before running them (default: %(default)s)")
 optional.add_argument("-l", "--log",
                       type=str,
                       help="output log file path")
@@ -92,56 +99,56 @@ else:
     logging.basicConfig(format="[%(asctime)s] %(levelname)s: %(message)s", level=logging.INFO)
 
 # Check for existing experiments
-try:
-    with open(args.output, 'r') as output_file:
-        skipped_experiments = {b["file"] for b in json.loads(output_file.read() or "[]")}
+with open_store(args.output) as store:
+    skipped_experiments = {file for file, _ in store.keys()}
+    if skipped_experiments:
         logging.info(f"Found {len(skipped_experiments)} existing experiments. These will not be ran again.")
-except FileNotFoundError:
-    skipped_experiments = {}
-    logging.debug("No existing experiments found.")
-
-# Generate experiments that still have to be run
-experiments = sorted(filter(lambda f: f not in skipped_experiments, glob.glob(args.input)), key=len)
-
-if len(experiments) == 0:
-    exit_with_error("No experiments found to run")
-
-max_memory = convert_size(args.memory, "MB", "B")
-logging.debug(f"Max memory: {max_memory}")
-
-i = 0
-for file in experiments:
-    i += 1
-    logging.info(f"[{i}/{len(experiments)}] Running {file}"
-                 + "(Time remaining: {:.0f}h {:.0f}m)".format(*divmod((len(experiments) - i) * args.timeout / 60, 60)))
-
-    t1 = time.time()
-    solved, log = run_prism(file, args.mu, args.property, max_memory, args.timeout)
-    t2 = time.time()
-    if solved:
-        result = to_success(file, log)
-        logging.info(f"Completed experiment in {t2 - t1}s")
     else:
-        result = to_failure(file, "canceled")
-        logging.info(f"Canceled: {result['reason']}")
-
-    logging.debug(log)
-    logging.debug(result)
-
-    os.makedirs(os.path.dirname(args.output), exist_ok=True)
-    try:
-        with open(args.output, "r") as output_file:
-            results = json.loads(output_file.read() or "[]")
-    except FileNotFoundError:
-        results = []
-
-    results.append(result)
-
-    with open(args.output, "w") as output_file:
-        json.dump(results, output_file, indent=4)
-
-    if args.log:
-        os.makedirs(os.path.dirname(args.log), exist_ok=True)
-        with open(args.log, "a") as log_file:
-            log_file.write(log)
-            log_file.write("-- END --")
+        logging.debug("No existing experiments found.")
+
+    # Generate experiments that still have to be run
+    experiments = sorted(filter(lambda f: f not in skipped_experiments, glob.glob(args.input)), key=len)
+
+    if len(experiments) == 0:
+        exit_with_error("No experiments found to run")
+
+    max_memory = convert_size(args.memory, "MB", "B")
+    logging.debug(f"Max memory: {max_memory}")
+
+    i = 0
+    for file in experiments:
+        i += 1
+        remaining = divmod((len(experiments) - i) * args.timeout / 60, 60)
+        logging.info(f"[{i}/{len(experiments)}] Running {file}"
+                     + "(Time remaining: {:.0f}h {:.0f}m)".format(*remaining))
+
+        # Compressed models are decompressed before PRISM is started, which is not part of the measured time
+        with staged(file, args.staging) as model_file:
+            t1 = time.time()
+            solved, log = run_prism(model_file, args.mu, args.property, max_memory, args.timeout)
+            t2 = time.time()
+
+        if solved:
+            result = to_success(file, log)
+            logging.info(f"Completed experiment in {t2 - t1}s")
+
+            # A model that is only exact for mu > 0 gives a wrong result at mu = 0, which is not stored
+            entry = read_model_entry(file)
+            if entry and requires_positive_mu(entry) and any(float(r["mu"]) == 0 for r in result["result"]):
+                logging.warning(f"Dropping the result of {file} for mu=0: models with collapsed tunnels are only "
+                                f"exact for mu > 0")
+                result["result"] = [r for r in result["result"] if float(r["mu"]) != 0]
+        else:
+            result = to_failure(file, "canceled")
+            logging.info(f"Canceled: {result['reason']}")
+
+        logging.debug(log)
+        logging.debug(result)
+
+        store.append(result)
+
+        if args.log:
+            os.makedirs(os.path.dirname(args.log), exist_ok=True)
+            with open(args.log, "a") as log_file:
+                log_file.write(log)
+                log_file.write("-- END --")
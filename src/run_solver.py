@@ -0,0 +1,140 @@
+import argparse
+import logging
+import sys
+import time
+from fractions import Fraction
+
+from explorer.explorer import explore, StateLimitExceeded
+from explorer.solver import solve
+from parser.compiled import CompiledCollection, is_compiled
+from parser.parsers import SokParser, select_levels
+from util.results import open_store
+from util.util import exit_with_error
+
+PARSERS = {
+    "sok": SokParser
+}
+
+
+def parse_mu(value: str) -> list[Fraction]:
+    start, step, stop = (Fraction(v) for v in value.split(":"))
+    return [start + i * step for i in range(int((stop - start) / step) + 1)]
+
+
+def to_success(file: str, mus: list[Fraction], probabilities: list[float]) -> dict:
+    return {
+        "file": file,
+        "solved": True,
+        "result": [{"mu": str(float(mu)), "result": str(prob)} for mu, prob in zip(mus, probabilities)]
+    }
+
+
+def to_failure(file: str, reason: str) -> dict:
+    return {
+        "file": file,
+        "solved": False,
+        "reason": reason
+    }
+
+
+arg_parser = argparse.ArgumentParser(add_help=False)
+
+required = arg_parser.add_argument_group("required")
+optional = arg_parser.add_argument_group("optional")
+
+required.add_argument("output",
+                      type=str,
+                      help="output result file path. Results are appended to a .jsonl file or a .db SQLite "
+                           "database, other files are a JSON array")
+required.add_argument("-mu",
+                      type=str,
+                      required=True,
+                      help="values for mu in min:step:max format")
+optional.add_argument("-i", "--input",
+                      type=str,
+                      help="input file path")
+optional.add_argument("-ix", "--indices",
+                      nargs="+",
+                      type=int,
+                      help="space seperated list of level indices. Omit to use all levels")
+optional.add_argument("-p", "--parser",
+                      type=str,
+                      choices=PARSERS.keys(), default="sok",
+                      help="parser type (default: %(default)s)")
+optional.add_argument("-e", "--epsilon",
+                      type=float,
+                      default=1e-6,
+                      help="maximum absolute error of the results (default: %(default)s)")
+optional.add_argument("-s", "--max-states",
+                      type=int,
+                      help="skip levels with more reachable states")
+optional.add_argument("--debug",
+                      action="store_true",
+                      help="enable debug logging")
+optional.add_argument("-h", "--help",
+                      action="help",
+                      help="show this help message and exit")
+
+args = arg_parser.parse_args()
+
+if args.debug:
+    logging.basicConfig(format="[%(asctime)s] %(levelname)s: %(message)s", level=logging.DEBUG)
+else:
+    logging.basicConfig(format="[%(asctime)s] %(levelname)s: %(message)s", level=logging.INFO)
+
+try:
+    mus = parse_mu(args.mu)
+except (ValueError, ZeroDivisionError):
+    exit_with_error(f"Invalid value for mu: {args.mu}")
+
+if not mus or not all(0 <= mu <= 1 for mu in mus):
+    exit_with_error("Values for mu must be between 0 and 1")
+
+# Open input
+if args.input is not None:
+    try:
+        in_file = CompiledCollection(args.input) if is_compiled(args.input) else open(args.input, "r")
+    except FileNotFoundError:
+        exit_with_error("File not found: " + args.input)
+else:
+    in_file = sys.stdin
+
+parser = PARSERS[args.parser]()
+logging.debug(f"Using parser: {type(parser)}")
+
+name = args.input or "stdin"
+
+with in_file, open_store(args.output) as store:
+    # Check for existing experiments
+    skipped_experiments = {file for file, _ in store.keys()}
+    if skipped_experiments:
+        logging.info(f"Found {len(skipped_experiments)} existing experiments. These will not be ran again.")
+    else:
+        logging.debug("No existing experiments found.")
+
+    try:
+        levels = in_file if isinstance(in_file, CompiledCollection) else parser.iter_levels(in_file)
+        levels = select_levels(levels, args.indices)
+    except IndexError:
+        exit_with_error("Level index out of range")
+
+    for i, level in levels:
+        # Levels are identified by the input file and their index
+        file = f"{name}:{i}"
+        if file in skipped_experiments:
+            continue
+
+        logging.info(f"Solving {file}")
+
+        t1 = time.time()
+        try:
+            model = explore(level, args.max_states)
+            result = to_success(file, mus, solve(model, mus, args.epsilon))
+            logging.info(f"Completed experiment in {time.time() - t1}s ({len(model.states)} states)")
+        except StateLimitExceeded as e:
+            result = to_failure(file, str(e))
+            logging.info(f"Canceled: {result['reason']}")
+
+        logging.debug(result)
+
+        store.append(result)
@@ -0,0 +1,96 @@
+import contextlib
+import gzip
+import io
+import lzma
+import os
+import shutil
+import tempfile
+import threading
+from typing import Iterator, TextIO
+
+COMPRESSIONS = {
+    ".gz": lambda path, mode: gzip.GzipFile(path, mode, mtime=0),
+    ".xz": lambda path, mode: lzma.LZMAFile(path, mode)
+}
+
+# Decompressed models are staged in memory if possible
+STAGING_DIRECTORY = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def compression(path: str) -> str | None:
+    extension = os.path.splitext(path)[1]
+    return extension if extension in COMPRESSIONS else None
+
+
+def split_extension(path: str) -> tuple[str, str]:
+    # The extension includes the model type in front of a compression, e.g. ".jani.gz"
+    root, extension = os.path.splitext(path)
+    if extension in COMPRESSIONS:
+        root, inner = os.path.splitext(root)
+        extension = inner + extension
+
+    return root, extension
+
+
+def open_text(path: str, mode: str = "r") -> TextIO:
+    # Opens a text file, which is compressed or decompressed on the fly if its extension is a compression.
+    # Compressed files do not store a modification time, so the same model is always the same file.
+    extension = compression(path)
+    if extension is None:
+        return open(path, mode)
+
+    return io.TextIOWrapper(COMPRESSIONS[extension](path, mode.rstrip("t") + "b"))
+
+
+@contextlib.contextmanager
+def staged(path: str, directory: str = STAGING_DIRECTORY) -> Iterator[str]:
+    # Path of a decompressed copy of the file while the context is open, for tools that cannot read compressed files.
+    # Uncompressed files are used as they are.
+    extension = compression(path)
+    if extension is None:
+        yield path
+        return
+
+    with tempfile.TemporaryDirectory(dir=directory) as staging:
+        # The copy keeps the file name without the compression, model checkers detect the model type by its extension
+        staged_path = os.path.join(staging, os.path.basename(path)[:-len(extension)])
+        with COMPRESSIONS[extension](path, "rb") as source, open(staged_path, "wb") as target:
+            shutil.copyfileobj(source, target, 1 << 20)
+
+        yield staged_path
+
+
+class SharedStaging(object):
+    # Staged copies of files that are used by a known number of runs, which may run concurrently. A file is staged by
+    # the first of its runs and removed when the last one finishes, or when the staging is closed before that.
+    def __init__(self, runs: dict[str, int], directory: str = STAGING_DIRECTORY):
+        self._directory = directory
+        self._remaining = dict(runs)
+        self._staged = {}
+        self._locks = {path: threading.Lock() for path in runs}
+
+    @contextlib.contextmanager
+    def staged(self, path: str) -> Iterator[str]:
+        with self._locks[path]:
+            if path not in self._staged:
+                stack = contextlib.ExitStack()
+                self._staged[path] = stack, stack.enter_context(staged(path, self._directory))
+
+            staged_path = self._staged[path][1]
+
+        try:
+            yield staged_path
+        finally:
+            with self._locks[path]:
+                self._remaining[path] -= 1
+                if self._remaining[path] == 0:
+                    self._staged.pop(path)[0].close()
+
+    def __enter__(self) -> "SharedStaging":
+        return self
+
+    def __exit__(self, *exc_info):
+        for stack, _ in self._staged.values():
+            stack.close()
+
+        self._staged.clear()
@@ -0,0 +1,25 @@
+import collections
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+def ordered_map(function: Callable[..., T], tasks: Iterable[tuple], jobs: int = 1) -> Iterator[T]:
+    # Runs the tasks in a pool of processes and yields their results in the order of the tasks.
+    # At most two tasks per process are in flight, so tasks are only taken from the iterable when a process is about to
+    # need them and finished results are not kept around.
+    if jobs == 1:
+        for task in tasks:
+            yield function(*task)
+        return
+
+    with ProcessPoolExecutor(jobs) as executor:
+        pending = collections.deque()
+        for task in tasks:
+            pending.append(executor.submit(function, *task))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
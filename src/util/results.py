@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from typing import Iterator
+
+
+def write_json(results: list[dict], path: str):
+    # Writes the results as a single JSON array. The array is written to a temporary file that then replaces the old
+    # file, so an interrupted write leaves the old file intact.
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(results, file, indent=4)
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(temporary, path)
+
+
+class ResultStore(ABC):
+    # Results of a benchmark or experiment, which are appended one at a time. A result is on disk before append
+    # returns, so a run that is killed loses at most the result it was storing.
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[dict]:
+        pass
+
+    @abstractmethod
+    def append(self, result: dict):
+        pass
+
+    def keys(self) -> Iterator[tuple[str, str | None]]:
+        # File and mu of every result, which identify the runs that do not have to be repeated when resuming
+        for result in self:
+            yield result["file"], result.get("mu")
+
+    def close(self):
+        pass
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JsonStore(ResultStore):
+    # A single JSON array, as written by earlier versions. Every append writes the whole array again.
+    def __init__(self, path: str):
+        super().__init__(path)
+        try:
+            with open(path, "r") as file:
+                self._results = json.loads(file.read() or "[]")
+        except FileNotFoundError:
+            self._results = []
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(list(self._results))
+
+    def append(self, result: dict):
+        self._results.append(result)
+        write_json(self._results, self.path)
+
+
+class JsonLinesStore(ResultStore):
+    # One JSON object per line, appended to the end of the file. A last line without a line break was cut off while it
+    # was written, it is ignored and removed before the next result is appended.
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file = None
+
+    def __iter__(self) -> Iterator[dict]:
+        try:
+            with open(self.path, "r") as file:
+                for line in file:
+                    if line.endswith("\n"):
+                        yield json.loads(line)
+        except FileNotFoundError:
+            return
+
+    def append(self, result: dict):
+        if self._file is None:
+            self._file = open(self.path, "ab+")
+            self._file.seek(0)
+            data = self._file.read()
+            if data and not data.endswith(b"\n"):
+                logging.warning(f"Removing an incomplete result at the end of {self.path}")
+                self._file.truncate(data.rfind(b"\n") + 1)
+
+        self._file.write(json.dumps(result).encode() + b"\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SqliteStore(ResultStore):
+    # A table with a row per result. File and mu are columns of their own, so runs can be looked up without reading
+    # the results.
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA synchronous = FULL")
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS results ("
+                                     "id INTEGER PRIMARY KEY, file TEXT NOT NULL, mu TEXT, result TEXT NOT NULL)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS results_run ON results (file, mu)")
+
+    def __iter__(self) -> Iterator[dict]:
+        for (result,) in self._connection.execute("SELECT result FROM results ORDER BY id"):
+            yield json.loads(result)
+
+    def keys(self) -> Iterator[tuple[str, str | None]]:
+        yield from self._connection.execute("SELECT file, mu FROM results ORDER BY id")
+
+    def append(self, result: dict):
+        with self._connection:
+            self._connection.execute("INSERT INTO results (file, mu, result) VALUES (?, ?, ?)",
+                                     (result["file"], result.get("mu"), json.dumps(result)))
+
+    def close(self):
+        self._connection.close()
+
+
+STORES = {
+    ".jsonl": JsonLinesStore,
+    ".db": SqliteStore,
+    ".sqlite": SqliteStore
+}
+
+
+def open_store(path: str) -> ResultStore:
+    # The type of store follows from the extension of the path, other files are a JSON array
+    return STORES.get(os.path.splitext(path)[1], JsonStore)(path)
@@ -0,0 +1,18 @@
+import os
+
+from generator.cache import model_entry, manifest_path, write_manifest, read_model_entry, requires_positive_mu
+from generator.jani_generators import JaniGenerator
+from parser.parsers import SokParser
+
+
+def test_collapsed_models_require_positive_mu(tmp_path):
+    level = SokParser().parse_levels("#######\n#@ $ .#\n#######\n")[0]
+    file_name = os.path.join(tmp_path, "level")
+    write_manifest(manifest_path(file_name), {
+        f"{file_name}_0.jani.gz": model_entry(level, JaniGenerator()),
+        f"{file_name}_1.jani.gz": model_entry(level, JaniGenerator(collapse_tunnels=True))
+    })
+
+    assert not requires_positive_mu(read_model_entry(f"{file_name}_0.jani.gz"))
+    assert requires_positive_mu(read_model_entry(f"{file_name}_1.jani.gz"))
+    assert read_model_entry(f"{file_name}_2.jani.gz") is None
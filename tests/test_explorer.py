@@ -0,0 +1,15 @@
+from explorer.explorer import explore, explore_pushes
+from parser.parsers import SokParser
+
+
+def _level(board: str):
+    return SokParser().parse_levels(board)[0]
+
+
+def test_pushes_merge_player_positions():
+    level = _level("#######\n#@ $ .#\n#  $ .#\n#######\n")
+    steps, pushes = explore(level), explore_pushes(level)
+
+    # Every push-level state stands for the step-level states of a region, the goal stays reachable
+    assert len(pushes.states) < len(steps.states)
+    assert pushes.goals
@@ -0,0 +1,25 @@
+import io
+
+from generator.jani_generators import JaniGenerator
+from generator.prism_generators import PrismGenerator
+from parser.parsers import SokParser
+
+
+def _level(board: str):
+    return SokParser().parse_levels(board)[0]
+
+
+def test_dead_squares_with_goal_on_top_row():
+    level = _level("#.#\n#$#\n#@#\n###\n")
+
+    # The box can be pushed onto the goal, only the bottom square is dead
+    assert list(level.dead_squares) == [7]
+
+
+def test_generate_with_goal_on_top_row():
+    level = _level("#.#\n#$#\n#@#\n###\n")
+
+    for generator in (JaniGenerator(), PrismGenerator()):
+        output = io.StringIO()
+        generator.write_model(level, output)
+        assert output.getvalue()
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from explorer.stats import model_stats
+from generator.jani_generators import JaniGenerator, JaniNonStochasticGenerator, JaniPosGenerator, JaniArrayGenerator
+from generator.prism_generators import PrismGenerator, PrismNonStochasticGenerator, PrismBGenerator, PrismPosGenerator
+from parser.parsers import SokParser
+
+LEVEL = SokParser().parse_levels(
+    "##########\n"
+    "#@      ##\n"
+    "# ##### ##\n"
+    "# #  $  .#\n"
+    "# #  ## ##\n"
+    "#    #####\n"
+    "######\n"
+)[0]
+
+GENERATORS = [
+    JaniGenerator(),
+    JaniGenerator(collapse_tunnels=True),
+    JaniNonStochasticGenerator(),
+    JaniPosGenerator(),
+    JaniArrayGenerator(),
+    PrismGenerator(),
+    PrismGenerator(collapse_tunnels=True),
+    PrismGenerator(compact=True),
+    PrismGenerator(collapse_tunnels=True, compact=True),
+    PrismBGenerator(),
+    PrismNonStochasticGenerator(),
+    PrismPosGenerator()
+]
+
+
+def _commands(model: str) -> int:
+    if model.startswith("{"):
+        return len(json.loads(model)["automata"][0]["edges"])
+
+    return sum(1 for line in model.splitlines() if line.strip().startswith("["))
+
+
+def _variables(model: str) -> int:
+    if model.startswith("{"):
+        return len(json.loads(model)["variables"])
+
+    return sum(1 for line in model.splitlines() if line.strip().endswith(";") and ": " in line and "init" in line)
+
+
+@pytest.mark.parametrize("generator", GENERATORS, ids=lambda g: f"{type(g).__name__}{g.options}")
+def test_statistics_describe_the_generated_model(generator):
+    model = generator.generate_model(LEVEL)
+    stats = model_stats(LEVEL, generator=generator)
+
+    assert stats["commands"] == _commands(model)
+    assert stats["variables"] == _variables(model)
+
+
+def test_collapsed_tunnels_have_fewer_states():
+    stats = model_stats(LEVEL, generator=JaniGenerator())
+    collapsed = model_stats(LEVEL, generator=JaniGenerator(collapse_tunnels=True))
+
+    assert collapsed["states"]["complete"]
+    assert collapsed["states"]["explored"] < stats["states"]["explored"]
+    assert collapsed["states"]["upper_bound"] < stats["states"]["upper_bound"]
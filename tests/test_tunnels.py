@@ -0,0 +1,122 @@
+import json
+from fractions import Fraction
+
+import pytest
+
+from explorer.explorer import explore
+from generator.generator import _box_tiles, _collapsed_tiles
+from generator.jani_generators import JaniGenerator
+from parser.parsers import SokParser
+
+# Levels the player has to cross a tunnel in, with a goal that is not always reached
+LEVELS = [
+    "#########\n"
+    "#@  #   #\n"
+    "# $     #\n"
+    "#   # . #\n"
+    "#   #####\n"
+    "# ###\n"
+    "#   #\n"
+    "#####\n",
+    "##########\n"
+    "#@      ##\n"
+    "# ##### ##\n"
+    "# #  $  .#\n"
+    "# #  ## ##\n"
+    "#    #####\n"
+    "######\n"
+]
+
+OPERATORS = {
+    "∧": lambda a, b: a and b,
+    "∨": lambda a, b: a or b,
+    "=": lambda a, b: a == b,
+    "≠": lambda a, b: a != b,
+    "≥": lambda a, b: a >= b,
+    "≤": lambda a, b: a <= b,
+    "min": min,
+    "max": max,
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "/": lambda a, b: Fraction(a) / b
+}
+
+
+def _evaluate(expression, values: dict):
+    if isinstance(expression, (bool, int, float)):
+        return expression
+
+    if isinstance(expression, str):
+        return values[expression]
+
+    if expression["op"] == "¬":
+        return not _evaluate(expression["exp"], values)
+
+    if expression["op"] == "ite":
+        return _evaluate(expression["then"] if _evaluate(expression["if"], values) else expression["else"], values)
+
+    return OPERATORS[expression["op"]](_evaluate(expression["left"], values), _evaluate(expression["right"], values))
+
+
+def _jani_mdp(text: str, mu: Fraction) -> tuple[list[list[dict[int, Fraction]]], set[int]]:
+    # Reachable states of a generated JANI model: the distributions of the choices of every state, and the goal states
+    model = json.loads(text)
+    names = [v["name"] for v in model["variables"]]
+    goal = model["properties"][0]["expression"]["values"]["exp"]["exp"]
+    edges = model["automata"][0]["edges"]
+
+    initial = tuple(v["initial-value"] for v in model["variables"])
+    index, states, choices = {initial: 0}, [initial], []
+    while len(choices) < len(states):
+        values = {**dict(zip(names, states[len(choices)])), "mu": mu}
+        state_choices = []
+        for edge in edges:
+            if not _evaluate(edge["guard"]["exp"], values):
+                continue
+
+            distribution = {}
+            for destination in edge["destinations"]:
+                target = {**values, **{a["ref"]: _evaluate(a["value"], values) for a in destination["assignments"]}}
+                state = tuple(target[name] for name in names)
+                if state not in index:
+                    index[state] = len(states)
+                    states.append(state)
+
+                p = _evaluate(destination["probability"]["exp"], values)
+                distribution[index[state]] = distribution.get(index[state], 0) + p
+
+            state_choices.append(distribution)
+
+        choices.append(state_choices)
+
+    goals = {i for i, state in enumerate(states) if _evaluate(goal, dict(zip(names, state)))}
+    return choices, goals
+
+
+def _pmax(choices: list[list[dict[int, Fraction]]], goals: set[int]) -> float:
+    values = [1.0 if s in goals else 0.0 for s in range(len(choices))]
+    while True:
+        updated = [1.0 if s in goals else max((sum(float(p) * values[t] for t, p in c.items()) for c in cs), default=0)
+                   for s, cs in enumerate(choices)]
+        if max(abs(a - b) for a, b in zip(updated, values)) < 1e-12:
+            return updated[0]
+
+        values = updated
+
+
+@pytest.mark.parametrize("board", LEVELS, ids=range(len(LEVELS)))
+@pytest.mark.parametrize("mu", [Fraction(3, 10), Fraction(7, 10), Fraction(1)])
+def test_collapsed_tunnels_keep_pmax(board: str, mu: Fraction):
+    level = SokParser().parse_levels(board)[0]
+    assert _collapsed_tiles(level, _box_tiles(level))
+
+    # The explorer builds the uncollapsed MDP independently of the generators
+    model = explore(level)
+    expected = _pmax([[{t: p.evaluate(mu) for t, p in c.distribution} for c in cs] for cs in model.choices],
+                     model.goals)
+
+    choices, goals = _jani_mdp(JaniGenerator(collapse_tunnels=True).generate_model(level), mu)
+    assert len(choices) < len(model.states)
+    assert _pmax(choices, goals) == pytest.approx(expected, abs=1e-9)
+    assert 0 < expected